@@ -1,38 +1,451 @@
 import os
+import re
+import time
+import random
+import sqlite3
+import difflib
+import hashlib
+import threading
+import subprocess
 import requests
 import json
-from google.cloud import translate_v2 as translate
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 # GitHub API & Google Translate Client
 GH_TOKEN = os.getenv("GH_TOKEN")
 GOOGLE_TRANSLATE_API_KEY = os.getenv("GOOGLE_TRANSLATE_API_KEY")
 GITHUB_REPO = os.getenv("GITHUB_REPOSITORY")
 GITHUB_EVENT_PATH = os.getenv("GITHUB_EVENT_PATH")
+GITHUB_EVENT_NAME = os.getenv("GITHUB_EVENT_NAME")
+# Overridable so the whole path can run against local stand-in servers
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+TRANSLATE_API_URL = os.getenv("TRANSLATE_API_URL", "https://translation.googleapis.com/language/translate/v2")
 
-translate_client = translate.Client.from_service_account_json("google-credentials.json")
+# Translations already made, kept between runs by the workflow's cache step
+TRANSLATION_CACHE = os.getenv("TRANSLATION_CACHE", ".translation_cache.sqlite")
+# "google" for the Google Translate client library, "rest" for its REST API
+# through a pooled session, "fake" for the offline stand-in
+TRANSLATE_BACKEND = os.getenv("TRANSLATE_BACKEND", "google")
 
-# Read GitHub Event Data
-with open(GITHUB_EVENT_PATH, "r") as f:
-    event_data = json.load(f)
+TARGET_LANGUAGES = ["zh-CN", "zh-TW"]
 
-# Get Issue/PR Content
-if "issue" in event_data:
-    issue_number = event_data["issue"]["number"]
-    issue_body = event_data["issue"]["body"]
-elif "pull_request" in event_data:
-    issue_number = event_data["pull_request"]["number"]
-    issue_body = event_data["pull_request"]["body"]
-else:
-    issue_number, issue_body = None, None
+# Google Translate accepts at most 128 texts per request
+MAX_BATCH_SEGMENTS = 128
 
-# Function to translate text
-def translate_text(text, target_language):
-    translation = translate_client.translate(text, target_language=target_language)
-    return translation["translatedText"]
+# Concurrent translation requests, and the rate they are held to
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", "8"))
+TRANSLATE_REQUESTS_PER_SECOND = float(os.getenv("TRANSLATE_REQUESTS_PER_SECOND", "10"))
 
-if issue_number and issue_body:
-    translated_zh_cn = translate_text(issue_body, "zh-CN")
-    translated_zh_tw = translate_text(issue_body, "zh-TW")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+
+FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+
+
+class GoogleTranslator:
+    """Translates batches of text with Google Translate."""
+    def __init__(self, credentials="google-credentials.json"):
+        from google.cloud import translate_v2 as translate
+
+        self.client = translate.Client.from_service_account_json(credentials)
+
+    def translate_batch(self, texts, target_language):
+        translations = self.client.translate(texts, target_language=target_language)
+        return [translation["translatedText"] for translation in translations]
+
+
+class TokenBucket:
+    """Thread-safe token bucket: acquire blocks until a request may be sent."""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size=TRANSLATE_WORKERS):
+    """Return a session whose connection pool is large enough for every worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def send_with_retry(session, method, url, limiter=None, **kwargs):
+    """
+    Send a request, retrying connection errors and 429/5xx responses.
+
+    Retries back off exponentially with jitter, or wait as long as a
+    Retry-After header asks.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = session.request(method, url, timeout=60, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+            delay = 2 ** attempt
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                response.raise_for_status()
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+        time.sleep(delay * (0.5 + random.random() / 2))
+
+
+class RestTranslator:
+    """Translates batches with the Google Translate REST API, sharing one pooled, rate-limited session."""
+    def __init__(self, api_key=GOOGLE_TRANSLATE_API_KEY, url=TRANSLATE_API_URL,
+                 requests_per_second=TRANSLATE_REQUESTS_PER_SECOND, session=None):
+        self.api_key = api_key
+        self.url = url
+        self.session = session or make_session()
+        self.limiter = TokenBucket(requests_per_second)
+
+    def translate_batch(self, texts, target_language):
+        response = send_with_retry(self.session, "POST", self.url, self.limiter, params={"key": self.api_key},
+                                   json={"q": list(texts), "target": target_language, "format": "text"})
+        return [translation["translatedText"] for translation in response.json()["data"]["translations"]]
+
+
+class FakeTranslator:
+    """Offline stand-in that tags each text with its target language and records each request."""
+    def __init__(self):
+        self.requests = []
+
+        self.lock = threading.Lock()
+
+    def translate_batch(self, texts, target_language):
+        with self.lock:
+            self.requests.append((target_language, list(texts)))
+        return [f"[{target_language}] {text}" for text in texts]
+
+
+def make_translator(backend=TRANSLATE_BACKEND):
+    if backend == "fake":
+        return FakeTranslator()
+    if backend == "rest":
+        return RestTranslator()
+    return GoogleTranslator()
+
+
+def split_segments(text):
+    """
+    Split a markdown body into segments.
+
+    Paragraphs (runs of non-blank lines) are translated separately; blank
+    lines and fenced code blocks are passed through untranslated.
+
+    Returns:
+        List of (segment, translate) pairs; joining the segments gives the text back
+    """
+    segments = []
+    paragraph = []
+    fence_end = None
+
+    def end_paragraph():
+        if paragraph:
+            segments.append(("".join(paragraph), True))
+            paragraph.clear()
+
+    for line in text.splitlines(keepends=True):
+        if fence_end is not None:
+            segments.append((line, False))
+            if fence_end.match(line):
+                fence_end = None
+            continue
+        opening = FENCE.match(line)
+        if opening or not line.strip():
+            end_paragraph()
+            if opening:
+                # The fence closes at a line of at least as many of the same character
+                marker = opening.group(1)
+                fence_end = re.compile(r'^ {0,3}' + re.escape(marker[0]) + '{%d,}\\s*$' % len(marker))
+            segments.append((line, False))
+            continue
+        paragraph.append(line)
+    end_paragraph()
+    return segments
+
+
+class TranslationCache:
+    """Translated segments keyed by a hash of the segment and the target language, in a SQLite file."""
+    def __init__(self, path=TRANSLATION_CACHE):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS segments (key BLOB PRIMARY KEY, translated TEXT)")
+
+    @staticmethod
+    def key(segment, target_language):
+        return hashlib.blake2b(f"{target_language}\0{segment}".encode("utf-8"), digest_size=16).digest()
+
+    def get(self, segment, target_language):
+        row = self.connection.execute("SELECT translated FROM segments WHERE key = ?",
+                                      (self.key(segment, target_language),)).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, entries, target_language):
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO segments VALUES (?, ?)",
+                                        [(self.key(segment, target_language), translated)
+                                         for segment, translated in entries])
+
+    def close(self):
+        self.connection.close()
+
+
+def find_missing(segments, target_language, cache, translated):
+    """Fill translated with cached segments and return the translatable segments that are not cached."""
+    missing = []
+    for segment, translate in segments:
+        if not translate or segment in translated:
+            continue
+        translated[segment] = cache.get(segment, target_language)
+        if translated[segment] is None:
+            missing.append(segment)
+    return missing
+
+
+def translate_missing(missing, translator, cache, workers=1):
+    """
+    Translate uncached segments and add them to the cache.
+
+    Each language's segments are sent in batches of up to MAX_BATCH_SEGMENTS,
+    across a thread pool when workers > 1. Trailing whitespace of a segment is
+    kept out of the request and restored after.
+
+    Args:
+        missing: Dictionary mapping each target language to its segments
+        translator: Object with translate_batch(texts, target_language)
+        cache: TranslationCache, written from this thread only
+        workers: Number of requests in flight at once
+
+    Returns:
+        Dictionary mapping each target language to {segment: translation}
+    """
+    batches = [(target_language, segments[start:start + MAX_BATCH_SEGMENTS])
+               for target_language, segments in missing.items()
+               for start in range(0, len(segments), MAX_BATCH_SEGMENTS)]
+
+    def send(job):
+        target_language, batch = job
+        bodies = [segment.rstrip() for segment in batch]
+        responses = translator.translate_batch(bodies, target_language)
+        return target_language, [(segment, response + segment[len(body):])
+                                 for segment, body, response in zip(batch, bodies, responses)]
+
+    results = {target_language: {} for target_language in missing}
+    if workers > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = list(executor.map(send, batches))
+    else:
+        responses = map(send, batches)
+    for target_language, entries in responses:
+        cache.put_many(entries, target_language)
+        results[target_language].update(entries)
+    return results
+
+
+def assemble(segments, translated):
+    """Join segments, replacing each translatable one with its translation."""
+    return "".join(translated[segment] if translate else segment for segment, translate in segments)
+
+
+def translate_segments(text, target_languages, translator, cache):
+    """
+    Translate a markdown body into several languages, sending only uncached segments.
+
+    The missing segments of each language go to the translator in one batch
+    (split only where a batch would exceed MAX_BATCH_SEGMENTS).
+
+    Returns:
+        Dictionary mapping each target language to the translated text
+    """
+    segments = split_segments(text)
+    translated = {target_language: {} for target_language in target_languages}
+    missing = {target_language: find_missing(segments, target_language, cache, translated[target_language])
+               for target_language in target_languages}
+    for target_language, entries in translate_missing(missing, translator, cache).items():
+        translated[target_language].update(entries)
+    return {target_language: assemble(segments, translated[target_language])
+            for target_language in target_languages}
+
+
+def sibling_path(path, target_language):
+    """Return the path of a markdown file's translation, e.g. notes.zh-CN.md for notes.md."""
+    root, extension = os.path.splitext(path)
+    return f"{root}.{target_language}{extension}"
+
+
+def is_translation(path, target_languages=TARGET_LANGUAGES):
+    return any(path.endswith(f".{target_language}.md") for target_language in target_languages)
+
+
+def git_output(*args):
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True).stdout
+
+
+def has_commit(rev):
+    """Return True if rev names a commit in this clone (a force-push can leave "before" out of it)."""
+    if not rev or set(rev) == {"0"}:
+        return False
+    return subprocess.run(["git", "cat-file", "-e", f"{rev}^{{commit}}"], capture_output=True).returncode == 0
+
+
+def changed_markdown_files(before, after):
+    """
+    Return the markdown files, other than translations, added or modified between two commits.
+
+    Without a usable before commit (a new branch, or one a force-push
+    replaced) only the files changed by after itself are returned.
+    """
+    names = None
+    if has_commit(before):
+        try:
+            names = git_output("diff", "--name-only", "--diff-filter=AM", before, after)
+        except subprocess.CalledProcessError:
+            names = None
+    if names is None:
+        names = git_output("diff-tree", "--no-commit-id", "--name-only", "-r", "--root", after)
+    return [name for name in names.splitlines()
+            if name.endswith(".md") and not is_translation(name) and os.path.isfile(name)]
+
+
+def previous_version(path, before, after=None):
+    """
+    Return a file's text before a push, or None if it did not exist then.
+
+    Without a usable before commit the parent of after is used, matching
+    the files changed_markdown_files falls back to.
+    """
+    if not has_commit(before):
+        if not after or not has_commit(f"{after}^"):
+            return None
+        before = f"{after}^"
+    try:
+        return git_output("show", f"{before}:{path}")
+    except subprocess.CalledProcessError:
+        return None
+
+
+def seed_from_sibling(segments, old_text, sibling_text, target_language, cache):
+    """
+    Cache the existing translations of segments a push did not change.
+
+    Segments are matched against the previous version of the file by diff.
+    The unchanged ones take their translation from the same position of the
+    existing translated file, as long as that file still lines up segment for
+    segment with the previous version, so a cold cache does not make an
+    edit re-translate the whole file.
+    """
+    old_segments = split_segments(old_text)
+    sibling_segments = split_segments(sibling_text)
+    if [translate for _, translate in old_segments] != [translate for _, translate in sibling_segments]:
+        return
+    matcher = difflib.SequenceMatcher(None, [segment for segment, _ in old_segments],
+                                      [segment for segment, _ in segments], autojunk=False)
+    entries = []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag != "equal":
+            continue
+        for old_index, new_index in zip(range(old_start, old_end), range(new_start, new_end)):
+            segment, translate = segments[new_index]
+            if translate and cache.get(segment, target_language) is None:
+                entries.append((segment, sibling_segments[old_index][0]))
+    if entries:
+        cache.put_many(entries, target_language)
+
+
+def translate_push(before, after, translator, cache, target_languages=TARGET_LANGUAGES, workers=TRANSLATE_WORKERS):
+    """
+    Write translated sibling files for the markdown files changed by a push.
+
+    Only segments that are neither cached nor recoverable from the existing
+    translations are sent; requests for every file and language run
+    concurrently.
+
+    Returns:
+        List of the translated files written
+    """
+    files = {}
+    missing = {target_language: [] for target_language in target_languages}
+    seen = {target_language: {} for target_language in target_languages}
+    for path in changed_markdown_files(before, after):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        segments = split_segments(text)
+        files[path] = segments
+        old_text = previous_version(path, before, after)
+        for target_language in target_languages:
+            sibling = sibling_path(path, target_language)
+            if old_text is not None and os.path.isfile(sibling):
+                with open(sibling, "r", encoding="utf-8") as f:
+                    seed_from_sibling(segments, old_text, f.read(), target_language, cache)
+            missing[target_language] += find_missing(segments, target_language, cache, seen[target_language])
+
+    for target_language, entries in translate_missing(missing, translator, cache, workers).items():
+        seen[target_language].update(entries)
+
+    written = []
+    for path, segments in files.items():
+        for target_language in target_languages:
+            sibling = sibling_path(path, target_language)
+            with open(sibling, "w", encoding="utf-8") as f:
+                f.write(assemble(segments, seen[target_language]))
+            written.append(sibling)
+    return written
+
+
+def read_event(event_data):
+    """Return the issue or pull request number and body of a GitHub event."""
+    if "issue" in event_data:
+        return event_data["issue"]["number"], event_data["issue"]["body"]
+    if "pull_request" in event_data:
+        return event_data["pull_request"]["number"], event_data["pull_request"]["body"]
+    return None, None
+
+
+def main():
+    with open(GITHUB_EVENT_PATH, "r") as f:
+        event_data = json.load(f)
+
+    if GITHUB_EVENT_NAME == "push":
+        cache = TranslationCache()
+        try:
+            written = translate_push(event_data.get("before"), event_data["after"], make_translator(), cache)
+        finally:
+            cache.close()
+        print("\n".join(written) or "No markdown files to translate.")
+        return
+
+    issue_number, issue_body = read_event(event_data)
+    if not (issue_number and issue_body):
+        return
+
+    cache = TranslationCache()
+    try:
+        translated = translate_segments(issue_body, TARGET_LANGUAGES, make_translator(), cache)
+    finally:
+        cache.close()
+    translated_zh_cn = translated["zh-CN"]
+    translated_zh_tw = translated["zh-TW"]
 
     comment_body = f"""
     **🌐 Auto-Translated Versions**
@@ -45,6 +458,10 @@ if issue_number and issue_body:
     """
 
     # Post Comment to GitHub
-    comment_url = f"https://api.github.com/repos/{GITHUB_REPO}/issues/{issue_number}/comments"
+    comment_url = f"{GITHUB_API_URL}/repos/{GITHUB_REPO}/issues/{issue_number}/comments"
     headers = {"Authorization": f"token {GH_TOKEN}", "Accept": "application/vnd.github.v3+json"}
-    requests.post(comment_url, headers=headers, json={"body": comment_body})
+    send_with_retry(make_session(1), "POST", comment_url, headers=headers, json={"body": comment_body})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,93 @@
+from __future__ import annotations
+
 import argparse
+import json
 import os
 import re
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Tuple, Optional
+from difflib import get_close_matches
 
-# PDF processing libraries
-import fitz  # PyMuPDF
-from pypdf import PdfReader, PdfWriter
+from grammar_backend import make_grammar_tool
+from corrector_service import default_output_path, iter_batch_jobs, run_batch, serve_socket, serve_stdin
+from page_result_cache import PageResultCache
+from pdf_page_writer import text_edits, write_corrections
+from pipeline_profiler import NULL_PROFILER, Profiler
+from repeated_blocks import find_repeated_blocks, merge_block_results, page_blocks, split_page
+from sentence_prefilter import PrefilteredGrammarTool, SentencePrefilter, supports_language
 
-# NLP and correction libraries
-import language_tool_python
-import spacy
-from difflib import get_close_matches
+# The PDF (fitz), NLP (language_tool_python, spacy) and NumPy libraries are
+# imported where they are first needed, so that --help and argument errors
+# return without paying for their start-up
 
 class PDFCorrector:
     """
     A class for detecting and correcting errors in PDF documents.
     """
-    def __init__(self, language='en-US'):
+    # spaCy components the sentence checks never read. Sentence boundaries and
+    # the 'auxpass' label both come from the parser, so only tok2vec and the
+    # parser need to run.
+    SPACY_UNUSED_COMPONENTS = ['tagger', 'attribute_ruler', 'lemmatizer', 'ner']
+
+    # Bump whenever the page checks change in a way that alters their results,
+    # so cached results from older versions are no longer used
+    CHECKS_VERSION = 2
+
+    def __init__(self, language='en-US', workers: int = 1, spacy_batch_size: int = 32,
+                 cache_dir: Optional[str] = None, cache_size_mb: int = 512,
+                 grammar_servers: int = 1, grammar_urls: Optional[List[str]] = None,
+                 grammar_chunk_chars: int = 2000, grammar_backend: str = 'languagetool',
+                 profiler: Optional[Profiler] = None, dedupe_min_pages: int = 0,
+                 findings_spill_rows: int = 100000, grammar_prefilter: bool = True,
+                 prefilter_words: Optional[str] = None):
         """Initialize the PDF corrector with language settings and NLP models."""
+        import spacy
+        
         self.language = language
-        # Initialize grammar checker
+        # Per-stage timing and metrics; the null profiler records nothing
+        self.profiler = profiler or NULL_PROFILER
+        # Settings a worker process needs to build an equivalent corrector
+        self._worker_options = {
+            'language': language,
+            'spacy_batch_size': spacy_batch_size,
+            'grammar_servers': grammar_servers,
+            'grammar_urls': grammar_urls,
+            'grammar_chunk_chars': grammar_chunk_chars,
+            'grammar_backend': grammar_backend,
+            'grammar_prefilter': grammar_prefilter,
+            'prefilter_words': prefilter_words,
+            'profile': profiler is not None,
+        }
+        # Number of processes used to check pages (1 = check in this process)
+        self.workers = max(1, workers)
+        self._pool = None
+        # Number of pages sent to spaCy's nlp.pipe at a time
+        self.spacy_batch_size = max(1, spacy_batch_size)
+        # Findings held in memory before the finding store spills them to disk
+        self.findings_spill_rows = findings_spill_rows
+        # Blocks found on at least this many pages (running headers, footers,
+        # boilerplate) are checked once; 0 checks every page in full
+        self.dedupe_min_pages = dedupe_min_pages
+        # Initialize grammar checker (one LanguageTool, or a pool of servers)
         print("Loading language correction tools...")
-        self.grammar_tool = language_tool_python.LanguageTool(language)
+        self.grammar_tool = make_grammar_tool(language, servers=grammar_servers, urls=grammar_urls,
+                                              chunk_chars=grammar_chunk_chars, backend=grammar_backend)
+        # Screen English sentences against a fixed word list and send only the
+        # suspicious ones to the grammar checker; off for full-check
+        # (--precision) runs, other languages, or when no word list is given
+        self.prefilter = None
+        if grammar_prefilter and prefilter_words and supports_language(language):
+            self.prefilter = SentencePrefilter(prefilter_words)
+            self.grammar_tool = PrefilteredGrammarTool(self.grammar_tool, self.prefilter)
         
         # Load NLP model for advanced text analysis
         try:
-            self.nlp = spacy.load('en_core_web_sm')
+            self.nlp = spacy.load('en_core_web_sm', exclude=self.SPACY_UNUSED_COMPONENTS)
         except:
             print("Downloading spaCy language model...")
             os.system('python -m spacy download en_core_web_sm')
-            self.nlp = spacy.load('en_core_web_sm')
+            self.nlp = spacy.load('en_core_web_sm', exclude=self.SPACY_UNUSED_COMPONENTS)
         
         # Common formatting standards
         self.formatting_standards = {
@@ -48,106 +106,215 @@ class PDFCorrector:
             'Ph.D.': True, 'M.D.': True, 'B.A.': True, 'B.S.': True,
             'U.S.': True, 'U.K.': True, 'E.U.': True,
         }
+        # One alternation over all abbreviations, so each error context is
+        # scanned once instead of once per abbreviation
+        self.abbreviation_pattern = re.compile(
+            '|'.join(re.escape(abbr) for abbr in sorted(self.abbreviations, key=len, reverse=True))
+        )
+        
+        # Optional on-disk cache of per-page results, keyed by page content
+        self.cache = None
+        if cache_dir:
+            self.cache = PageResultCache(cache_dir, max_bytes=cache_size_mb * 1024 * 1024)
         
         print("PDF Corrector initialized successfully.")
 
-    def load_pdf(self, pdf_path: str) -> Tuple[PdfReader, fitz.Document]:
+    def checker_fingerprint(self) -> str:
+        """
+        Identify the checker versions and settings that page results depend on.
+        
+        Returns:
+            String that changes whenever cached page results may be stale
         """
-        Load a PDF file using both pypdf and PyMuPDF for different operations.
+        import language_tool_python
+        import spacy
+        
+        return '|'.join([
+            str(self.CHECKS_VERSION),
+            getattr(language_tool_python, '__version__', ''),
+            f"{type(self.grammar_tool).__name__}:{getattr(self.grammar_tool, 'chunk_chars', '')}",
+            f"prefilter:{self.prefilter.fingerprint}" if self.prefilter else 'full',
+            spacy.__version__,
+            self.nlp.meta.get('name', ''),
+            self.nlp.meta.get('version', ''),
+            ','.join(sorted(self.abbreviations)),
+        ])
+
+    def close(self):
+        """Shut down the page-checking worker pool, the grammar checker and the result cache."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.grammar_tool.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """
+        Return the worker pool, starting it on first use.
+        
+        Each worker loads its own LanguageTool and spaCy model once in
+        _init_page_worker and keeps them for the lifetime of the pool.
+        """
+        if self._pool is None:
+            print(f"Starting {self.workers} page-checking workers...")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_page_worker,
+                initargs=(self._worker_options,)
+            )
+        return self._pool
+
+    def load_pdf(self, pdf_path: str) -> fitz.Document:
+        """
+        Load a PDF file with PyMuPDF for text and structure extraction.
+        
+        The write phase reopens the output separately, and only once
+        corrections are actually being written.
         
         Args:
             pdf_path: Path to the PDF file
             
         Returns:
-            Tuple containing pypdf PdfReader and PyMuPDF Document objects
+            PyMuPDF Document object
         """
+        import fitz  # PyMuPDF
+        
         print(f"Loading PDF: {pdf_path}")
-        reader = PdfReader(pdf_path)
-        doc = fitz.open(pdf_path)
-        return reader, doc
+        with self.profiler.stage('load_pdf'):
+            doc = fitz.open(pdf_path)
+        self.profiler.add_bytes('load_pdf', read=os.path.getsize(pdf_path))
+        return doc
+
+    def extract_pages(self, doc: fitz.Document) -> Tuple[List[str], Dict]:
+        """
+        Extract page text and document structure in a single pass.
+        
+        Each page is visited once and its layout is parsed once with
+        get_text("dict"); the plain text is rebuilt from those blocks.
+        
+        Args:
+            doc: PyMuPDF Document object
+            
+        Returns:
+            Tuple of (list of page texts, document structure information)
+        """
+        print("Extracting text and analyzing document structure...")
+        structure = self._new_structure()
+        if self.dedupe_min_pages:
+            # Where each text block sits in its page text, for check_pages_deduplicated
+            structure['page_blocks'] = []
+        page_texts = list(self.iter_pages(doc, structure))
+        return page_texts, structure
+
+    def iter_pages(self, doc: fitz.Document, structure: Dict) -> Iterator[str]:
+        """
+        Lazily extract page text, adding each page to the structure as it goes.
+        
+        Only one page's layout is held in memory at a time.
+        
+        Args:
+            doc: PyMuPDF Document object
+            structure: Document structure to add each page's fonts, links and images to
+            
+        Returns:
+            Iterator of page texts, in page order
+        """
+        for page_num, page in enumerate(doc):
+            with self.profiler.stage('extract'):
+                blocks = page.get_text("dict")["blocks"]
+                self._add_page_structure(structure, page, page_num, blocks)
+                text = self._text_from_blocks(blocks)
+                if 'page_blocks' in structure:
+                    structure['page_blocks'].append(page_blocks(blocks, page.rect.height))
+            yield text
+        structure['fonts'] = structure['spans'].font_sizes()
 
     def extract_text_by_page(self, doc: fitz.Document) -> List[str]:
         """
         Extract text from each page of the PDF.
         
+        Kept for callers of the older API; the text comes from extract_pages.
+        
         Args:
             doc: PyMuPDF Document object
             
         Returns:
             List of strings, each containing text from one page
         """
-        print("Extracting text from PDF...")
-        page_texts = []
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text = page.get_text("text")
-            page_texts.append(text)
-        return page_texts
+        return self.extract_pages(doc)[0]
 
     def extract_document_structure(self, doc: fitz.Document) -> Dict:
         """
         Analyze the document structure, identifying headings, paragraphs, and formatting.
         
+        Kept for callers of the older API; the structure comes from extract_pages.
+        
         Args:
             doc: PyMuPDF Document object
             
         Returns:
             Dictionary containing document structure information
         """
-        print("Analyzing document structure...")
-        structure = {
+        return self.extract_pages(doc)[1]
+
+    def _new_structure(self) -> Dict:
+        """Return an empty document structure dictionary."""
+        from span_table import SpanTable
+        
+        return {
             'headings': [],
             'paragraphs': [],
             'tables': [],
             'images': [],
             'hyperlinks': [],
-            'fonts': {}
+            # Font name -> sizes used; filled in from 'spans' once all pages are added
+            'fonts': {},
+            # Every text span (page, font, size, flags, bbox, characters) as columns
+            'spans': SpanTable()
         }
+
+    def _text_from_blocks(self, blocks: List[Dict]) -> str:
+        """Rebuild a page's plain text (as get_text("text") returns it) from its dict blocks."""
+        parts = []
+        for block in blocks:
+            if "lines" in block:
+                for line in block["lines"]:
+                    parts.extend(span["text"] for span in line["spans"])
+                    parts.append("\n")
+        return "".join(parts)
+
+    def _add_page_structure(self, structure: Dict, page: fitz.Page, page_num: int, blocks: List[Dict]):
+        """
+        Add one page's fonts, links and images to the document structure.
         
-        # Extract headings and font information
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Get font information
-            font_dict = {}
-            blocks = page.get_text("dict")["blocks"]
-            for block in blocks:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            font_name = span["font"]
-                            font_size = span["size"]
-                            if font_name not in font_dict:
-                                font_dict[font_name] = []
-                            if font_size not in font_dict[font_name]:
-                                font_dict[font_name].append(font_size)
-            
-            # Add to document fonts
-            for font, sizes in font_dict.items():
-                if font not in structure['fonts']:
-                    structure['fonts'][font] = []
-                structure['fonts'][font] = list(set(structure['fonts'].get(font, []) + sizes))
-            
-            # Extract links
-            links = page.get_links()
-            for link in links:
-                if 'uri' in link:
-                    structure['hyperlinks'].append({
-                        'page': page_num,
-                        'uri': link['uri']
-                    })
-            
-            # Extract images (basic detection)
-            images = page.get_images(full=True)
-            for img_index, img in enumerate(images):
-                structure['images'].append({
+        Args:
+            structure: Document structure being built
+            page: PyMuPDF Page object
+            page_num: Zero-based page number
+            blocks: The page's get_text("dict") blocks
+        """
+        # Record font information for every span
+        structure['spans'].add_page(page_num, blocks)
+        
+        # Extract links
+        links = page.get_links()
+        for link in links:
+            if 'uri' in link:
+                structure['hyperlinks'].append({
                     'page': page_num,
-                    'index': img_index,
-                    'width': img[2],
-                    'height': img[3]
+                    'uri': link['uri']
                 })
         
-        return structure
+        # Extract images (basic detection)
+        images = page.get_images(full=True)
+        for img_index, img in enumerate(images):
+            structure['images'].append({
+                'page': page_num,
+                'index': img_index,
+                'width': img[2],
+                'height': img[3]
+            })
 
     def check_grammar_spelling(self, text: str) -> Tuple[str, List[Dict]]:
         """
@@ -159,13 +326,14 @@ class PDFCorrector:
         Returns:
             Tuple of (corrected_text, list of errors)
         """
-        errors = self.grammar_tool.check(text)
+        with self.profiler.stage('grammar'):
+            errors = self.grammar_tool.check(text)
         error_list = []
         
         for error in errors:
             # Filter out false positives for common abbreviations
             context = text[max(0, error.offset - 5):error.offset + error.errorLength + 5]
-            if any(abbr in context for abbr in self.abbreviations):
+            if self.abbreviation_pattern.search(context):
                 continue
                 
             error_list.append({
@@ -176,8 +344,9 @@ class PDFCorrector:
                 'length': error.errorLength
             })
         
-        # Apply corrections
-        corrected_text = self.grammar_tool.correct(text)
+        # Apply corrections from the matches we already have; calling
+        # grammar_tool.correct() would run the whole check a second time
+        corrected_text = apply_corrections(text, errors)
         
         return corrected_text, error_list
 
@@ -191,7 +360,29 @@ class PDFCorrector:
         Returns:
             List of potential sentence structure issues
         """
-        doc = self.nlp(text)
+        return self._sentence_structure_issues(self.nlp(text))
+
+    def check_sentence_structure_batch(self, texts: List[str]):
+        """
+        Analyze many texts for sentence structure issues in batches.
+        
+        Texts are streamed through nlp.pipe, which is much cheaper than
+        calling the pipeline once per text.
+        
+        Args:
+            texts: Text contents to analyze
+            
+        Returns:
+            Iterator of sentence structure issue lists, one per text, in order
+        """
+        docs = self.nlp.pipe(texts, batch_size=self.spacy_batch_size)
+        for _ in texts:
+            with self.profiler.stage('sentence_structure'):
+                issues = self._sentence_structure_issues(next(docs))
+            yield issues
+
+    def _sentence_structure_issues(self, doc) -> List[Dict]:
+        """Collect long-sentence and passive-voice issues from a parsed spaCy Doc."""
         issues = []
         
         for sent in doc.sents:
@@ -219,6 +410,128 @@ class PDFCorrector:
                 
         return issues
 
+    def check_page(self, text: str) -> Tuple[str, List[Dict], List[Dict]]:
+        """
+        Run all text checks on a single page.
+        
+        Args:
+            text: Text content of the page
+            
+        Returns:
+            Tuple of (corrected_text, grammar/spelling errors, sentence structure issues)
+        """
+        corrected_text, errors = self.check_grammar_spelling(text)
+        structure_issues = self.check_sentence_structure(text)
+        return corrected_text, errors, structure_issues
+
+    def check_page_batch(self, texts: List[str]):
+        """
+        Run all text checks on a batch of pages.
+        
+        Grammar is checked page by page; sentence structure is analyzed for the
+        whole batch through check_sentence_structure_batch.
+        
+        Args:
+            texts: Text contents of the pages
+            
+        Returns:
+            Iterator of check_page results, in page order
+        """
+        structure_results = self.check_sentence_structure_batch(texts)
+        for text, structure_issues in zip(texts, structure_results):
+            corrected_text, errors = self.check_grammar_spelling(text)
+            yield corrected_text, errors, structure_issues
+
+    def check_pages(self, page_texts: List[str]):
+        """
+        Check every page, reusing cached results for pages seen before.
+        
+        Args:
+            page_texts: List of page texts
+            
+        Returns:
+            Iterator of check_page results, in page order
+        """
+        if self.cache is None:
+            return self._check_uncached_pages(page_texts)
+        return self._check_cached_pages(page_texts)
+
+    def check_pages_deduplicated(self, page_texts: List[str], pages: List[List[Tuple]]):
+        """
+        Check every page, checking blocks repeated across pages only once.
+        
+        Blocks with the same normalized text and vertical position on at
+        least dedupe_min_pages pages are taken out of the page texts. Each
+        distinct repeated block is checked on its own, the rest of each page
+        is checked as usual, and the block results are fanned back out to
+        every page the block appears on.
+        
+        Args:
+            page_texts: List of page texts
+            pages: page_blocks of every page, in page order
+            
+        Returns:
+            Iterator of check_page results, in page order
+        """
+        repeated = find_repeated_blocks(pages, self.dedupe_min_pages)
+        if not repeated:
+            yield from self.check_pages(page_texts)
+            return
+        
+        splits = [split_page(text, segments, repeated) for text, segments in zip(page_texts, pages)]
+        block_pages = {}
+        for text, (_, parts) in zip(page_texts, splits):
+            for block in {text[start:end] for start, end, is_repeated in parts if is_repeated}:
+                block_pages[block] = block_pages.get(block, 0) + 1
+        blocks = list(block_pages)
+        skipped = sum(len(text) - len(residual) for text, (residual, _) in zip(page_texts, splits))
+        print(f"Checking {len(blocks)} repeated blocks once; "
+              f"{skipped - sum(map(len, blocks))} characters of repeated text skipped.")
+        
+        # The blocks come first so that their results are ready for every page
+        results = self.check_pages(blocks + [residual for residual, _ in splits])
+        block_results = {block: next(results) for block in blocks}
+        for text, (residual, parts), residual_result in zip(page_texts, splits, results):
+            if len(residual) == len(text):
+                yield residual_result
+            else:
+                yield merge_block_results(text, parts, residual, residual_result, block_results, block_pages)
+
+    def _check_cached_pages(self, page_texts: List[str]):
+        """Check only the pages missing from the cache and store their results."""
+        fingerprint = self.checker_fingerprint()
+        keys = [PageResultCache.make_key(text, self.language, fingerprint) for text in page_texts]
+        with self.profiler.stage('cache_lookup'):
+            cached = [self.cache.get(key) for key in keys]
+        missing_texts = [text for text, result in zip(page_texts, cached) if result is None]
+        print(f"{len(page_texts) - len(missing_texts)} of {len(page_texts)} pages found in cache.")
+        
+        fresh = self._check_uncached_pages(missing_texts)
+        for key, result in zip(keys, cached):
+            if result is None:
+                result = next(fresh)
+                self.cache.put(key, result)
+            yield result
+
+    def _check_uncached_pages(self, page_texts: List[str]):
+        """Check pages in this process or across the worker pool."""
+        if self.workers == 1 or len(page_texts) < 2:
+            return self.check_page_batch(page_texts)
+        
+        # Each worker gets a run of consecutive pages so it can batch them
+        # through spaCy. Executor.map yields results in submission order, so
+        # pages are merged back in order no matter which worker finishes first.
+        chunk_len = max(1, min(self.spacy_batch_size, len(page_texts) // (self.workers * 4)))
+        chunks = [page_texts[i:i + chunk_len] for i in range(0, len(page_texts), chunk_len)]
+        chunk_results = self._get_pool().map(_check_page_batch_worker, chunks)
+        return self._merge_worker_results(chunk_results)
+
+    def _merge_worker_results(self, chunk_results):
+        """Flatten worker results into page order, folding in the workers' stage timings."""
+        for results, stages in chunk_results:
+            self.profiler.merge(stages)
+            yield from results
+
     def check_formatting_consistency(self, structure: Dict) -> List[Dict]:
         """
         Check for formatting consistency issues.
@@ -239,6 +552,11 @@ class PDFCorrector:
                 'fonts': list(structure['fonts'].keys())
             })
         
+        # Check font sizes against the formatting standards
+        spans = structure.get('spans')
+        if spans is not None and len(spans):
+            issues.extend(self._check_font_sizes(spans))
+        
         # Check for broken hyperlinks (would need validation in a real implementation)
         if structure['hyperlinks']:
             for link in structure['hyperlinks']:
@@ -251,6 +569,49 @@ class PDFCorrector:
         
         return issues
 
+    def _check_font_sizes(self, spans: SpanTable) -> List[Dict]:
+        """
+        Compare body and heading font sizes with the formatting standards.
+        
+        The body size is the size holding the most characters; spans clearly
+        larger than it are treated as headings and should use one of the
+        standard heading sizes.
+        
+        Args:
+            spans: Span table of the document
+            
+        Returns:
+            List of formatting issues
+        """
+        import numpy as np
+        
+        issues = []
+        standards = self.formatting_standards
+        body_size = spans.body_font_size()
+        if abs(body_size - standards['body_font_size']) > 0.5:
+            issues.append({
+                'type': 'body_font_size',
+                'details': f"Body text is set in {body_size:g} pt; the standard body size is "
+                           f"{standards['body_font_size']} pt."
+            })
+        
+        sizes = spans.size
+        heading_standards = np.array([standards['heading1_font_size'], standards['heading2_font_size']])
+        is_heading = sizes >= body_size + 1.5
+        off_standard = is_heading & (np.abs(sizes[:, None] - heading_standards).min(axis=1) > 0.5)
+        if off_standard.any():
+            pages = spans.page
+            rounded = np.round(sizes[off_standard] * 2) / 2
+            for size in np.unique(rounded):
+                on_pages = np.unique(pages[off_standard][rounded == size]) + 1
+                issues.append({
+                    'type': 'heading_font_size',
+                    'details': f"Heading text set in {size:g} pt on {len(on_pages)} page(s) "
+                               f"(first: {', '.join(str(p) for p in on_pages[:5])}); standard heading sizes are "
+                               f"{standards['heading1_font_size']} and {standards['heading2_font_size']} pt."
+                })
+        return issues
+
     def correct_pdf(self, pdf_path: str, output_path: str, interactive: bool = True) -> Dict:
         """
         Main method to correct a PDF file.
@@ -263,113 +624,366 @@ class PDFCorrector:
         Returns:
             Dictionary with correction statistics
         """
-        # Load PDF with both libraries
-        reader, doc = self.load_pdf(pdf_path)
+        from finding_store import ERROR
+        
+        # Load PDF
+        doc = self.load_pdf(pdf_path)
         
-        # Extract text and structure
-        page_texts = self.extract_text_by_page(doc)
-        structure = self.extract_document_structure(doc)
+        # Extract text and structure in one pass over the pages
+        page_texts, structure = self.extract_pages(doc)
+        doc.close()
         
         # Initialize statistics
-        stats = {
-            'pages_processed': len(page_texts),
-            'grammar_errors': 0,
-            'spelling_errors': 0,
-            'structure_issues': 0,
-            'formatting_issues': 0,
-            'corrections_made': 0
-        }
+        stats = self._new_stats(len(page_texts))
         
         # Process each page
         corrected_texts = []
-        all_errors = []
-        
-        print("Checking document for errors...")
-        for i, text in enumerate(page_texts):
-            print(f"Checking page {i+1}...")
-            
-            # Check grammar and spelling
-            corrected_text, errors = self.check_grammar_spelling(text)
-            stats['grammar_errors'] += len([e for e in errors if 'Grammar' in e['message']])
-            stats['spelling_errors'] += len([e for e in errors if 'Spelling' in e['message']])
-            
-            # Check sentence structure
-            structure_issues = self.check_sentence_structure(text)
-            stats['structure_issues'] += len(structure_issues)
+        findings = self._new_findings()
+        try:
+            print("Checking document for errors...")
+            if 'page_blocks' in structure:
+                page_results = self.check_pages_deduplicated(page_texts, structure.pop('page_blocks'))
+            else:
+                page_results = self.check_pages(page_texts)
+            page_results = self.profiler.iter_pages(page_results)
+            for i, (corrected_text, errors, structure_issues) in enumerate(page_results):
+                print(f"Checking page {i+1}...")
+                self._add_page_findings(findings, i + 1, errors, structure_issues)
+                corrected_texts.append(corrected_text)
             
-            # Add page number to errors
-            for error in errors:
-                error['page'] = i + 1
-            all_errors.extend(errors)
+            # Check formatting consistency
+            with self.profiler.stage('formatting'):
+                formatting_issues = self.check_formatting_consistency(structure)
+            for issue in formatting_issues:
+                findings.add_formatting_issue(issue)
+            self._count_findings(stats, findings)
             
-            corrected_texts.append(corrected_text)
+            # Interactive mode - show errors and confirm corrections
+            if interactive and findings.count(category=ERROR):
+                self._print_error_summary(findings, page_texts)
+                proceed = input("\nApply corrections? (yes/no): ").lower().strip()
+                if proceed != 'yes':
+                    print("Operation cancelled.")
+                    return stats
+        finally:
+            findings.close()
         
-        # Check formatting consistency
-        formatting_issues = self.check_formatting_consistency(structure)
-        stats['formatting_issues'] += len(formatting_issues)
+        # Only pages whose text changed are rewritten
+        page_edits = {
+            i: (len(text), text_edits(text, corrected_text))
+            for i, (text, corrected_text) in enumerate(zip(page_texts, corrected_texts))
+            if corrected_text != text
+        }
+        self._write_output(pdf_path, output_path, stats, page_edits)
         
-        # Interactive mode - show errors and confirm corrections
-        if interactive and all_errors:
-            print("\n" + "="*50)
-            print(f"Found {len(all_errors)} potential issues:")
-            print("="*50)
-            
-            # Show sample of errors (limit to 10 for readability)
-            for i, error in enumerate(all_errors[:10]):
-                print(f"{i+1}. Page {error['page']}: {error['message']}")
-                print(f"   Context: \"{error['context']}\"")
-                if error.get('suggestions'):
-                    print(f"   Suggestions: {', '.join(error['suggestions'][:3])}")
-                print()
-            
-            if len(all_errors) > 10:
-                print(f"... and {len(all_errors) - 10} more issues")
-            
-            proceed = input("\nApply corrections? (yes/no): ").lower().strip()
-            if proceed != 'yes':
-                print("Operation cancelled.")
-                return stats
+        print(f"Correction completed. Saved to {output_path}")
+        print(f"Statistics: {stats}")
         
-        # Apply corrections (in a real implementation, this would modify the PDF content)
-        # For now, we'll just report what would be done
-        print("\nApplying corrections...")
-        writer = PdfWriter()
+        return stats
+
+    def correct_pdf_streaming(self, pdf_path: str, output_path: str, findings_path: str) -> Dict:
+        """
+        Correct a PDF while streaming findings to a JSONL file page by page.
         
-        # In a complete implementation, this would apply the text corrections to the PDF
-        # This is simplified as actual text replacement in PDFs is complex
-        for i, page in enumerate(reader.pages):
-            # In a real implementation, update the page with corrected text
-            # page.extract_text() would be replaced with corrected_texts[i]
-            writer.add_page(page)
-            stats['corrections_made'] += 1
+        Pages are extracted, checked and reported in small batches, so memory
+        stays flat regardless of page count and each page's record can be read
+        as soon as it is written. Every line is a JSON object with a 'type' of
+        'page', 'formatting' or 'summary'. Streaming runs are never interactive.
         
-        # Save the "corrected" PDF
-        with open(output_path, "wb") as f:
-            writer.write(f)
+        Args:
+            pdf_path: Path to the input PDF
+            output_path: Path for the corrected PDF
+            findings_path: Path of the JSONL findings file to write
+            
+        Returns:
+            Dictionary with correction statistics
+        """
+        doc = self.load_pdf(pdf_path)
+        stats = self._new_stats(len(doc))
+        structure = self._new_structure()
+        
+        print(f"Checking document for errors, streaming findings to {findings_path}...")
+        store = self._new_findings()
+        try:
+            with open(findings_path, "w", encoding="utf-8") as findings:
+                page_texts = self.iter_pages(doc, structure)
+                batch_size = self.workers * self.spacy_batch_size
+                page_num = 0
+                # Only the edits of changed pages are kept for the write phase
+                page_edits = {}
+                while True:
+                    batch = list(islice(page_texts, batch_size))
+                    if not batch:
+                        break
+                    page_results = self.profiler.iter_pages(self.check_pages(batch), first_page=page_num + 1)
+                    for text, (corrected_text, errors, structure_issues) in zip(batch, page_results):
+                        if corrected_text != text:
+                            page_edits[page_num] = (len(text), text_edits(text, corrected_text))
+                        page_num += 1
+                        self._add_page_findings(store, page_num, errors, structure_issues)
+                        for error in errors:
+                            error['page'] = page_num
+                        self._write_record(findings, {
+                            'type': 'page',
+                            'page': page_num,
+                            'errors': errors,
+                            'structure_issues': structure_issues,
+                            'corrected_text': corrected_text
+                        })
+                doc.close()
+                
+                with self.profiler.stage('formatting'):
+                    formatting_issues = self.check_formatting_consistency(structure)
+                for issue in formatting_issues:
+                    store.add_formatting_issue(issue)
+                self._count_findings(stats, store)
+                self._write_record(findings, {'type': 'formatting', 'issues': formatting_issues})
+                
+                self._write_output(pdf_path, output_path, stats, page_edits)
+                self._write_record(findings, {'type': 'summary', 'stats': stats})
+        finally:
+            store.close()
         
         print(f"Correction completed. Saved to {output_path}")
         print(f"Statistics: {stats}")
         
         return stats
 
+    def _write_record(self, stream, record: Dict):
+        """Write one JSONL record and flush it so readers see it immediately."""
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        stream.flush()
+
+    def _new_stats(self, page_count: int) -> Dict:
+        """Return zeroed correction statistics for a document."""
+        return {
+            'pages_processed': page_count,
+            'grammar_errors': 0,
+            'spelling_errors': 0,
+            'structure_issues': 0,
+            'formatting_issues': 0,
+            'corrections_made': 0
+        }
+
+    def _new_findings(self) -> FindingStore:
+        """Return an empty finding store that spills to disk past findings_spill_rows findings."""
+        from finding_store import FindingStore
+        
+        return FindingStore(spill_rows=self.findings_spill_rows)
+
+    def _add_page_findings(self, findings: FindingStore, page: int, errors: List[Dict],
+                           structure_issues: List[Dict]):
+        """Add one page's grammar, spelling and structure findings to the finding store."""
+        for error in errors:
+            findings.add_error(page, error)
+        for issue in structure_issues:
+            findings.add_structure_issue(page, issue)
+
+    def _count_findings(self, stats: Dict, findings: FindingStore):
+        """Fill in the statistics from the finding store's counters."""
+        from finding_store import FORMATTING, STRUCTURE
+        
+        stats['grammar_errors'] = findings.count(kind='grammar')
+        stats['spelling_errors'] = findings.count(kind='spelling')
+        stats['structure_issues'] = findings.count(category=STRUCTURE)
+        stats['formatting_issues'] = findings.count(category=FORMATTING)
+
+    def _print_error_summary(self, findings: FindingStore, page_texts: List[str], limit: int = 10):
+        """
+        Show the first grammar and spelling errors for the interactive prompt.
+        
+        An error in a block repeated across pages is shown once, not once per page.
+        
+        Args:
+            findings: Finding store of the document
+            page_texts: List of page texts
+            limit: Number of errors to show
+        """
+        from finding_store import ERROR
+        
+        print("\n" + "="*50)
+        print(f"Found {findings.count(category=ERROR)} potential issues:")
+        print("="*50)
+        
+        shown = 0
+        seen = set()
+        for error in findings.query(category=ERROR):
+            if error.repeated:
+                key = (error.message, page_texts[error.page - 1][error.offset:error.offset + error.length])
+                if key in seen:
+                    continue
+                seen.add(key)
+            shown += 1
+            if shown > limit:
+                continue
+            print(f"{shown}. Page {error.page}: {error.message}")
+            print(f"   Context: \"{error.text}\"")
+            if error.suggestions:
+                print(f"   Suggestions: {', '.join(error.suggestions[:3])}")
+            if error.repeated:
+                print(f"   Repeated on {error.repeated} pages")
+            print()
+        
+        if shown > limit:
+            print(f"... and {shown - limit} more issues")
+
+    def _write_output(self, pdf_path: str, output_path: str, stats: Dict, page_edits: Dict):
+        """
+        Write the corrected PDF, rewriting only the pages that changed.
+        
+        Args:
+            pdf_path: Path to the input PDF
+            output_path: Path for the corrected PDF
+            stats: Correction statistics to update
+            page_edits: Maps a zero-based page number to (page text length, text_edits)
+        """
+        print("\nApplying corrections...")
+        with self.profiler.stage('write'):
+            stats['corrections_made'] += write_corrections(pdf_path, output_path, page_edits)
+        self.profiler.add_bytes('write', read=os.path.getsize(pdf_path), written=os.path.getsize(output_path))
+
+def apply_corrections(text: str, matches) -> str:
+    """
+    Build the corrected text from LanguageTool matches.
+    
+    The first replacement of each match is applied in offset order. Matches
+    without replacements, or overlapping a match that was already applied,
+    are skipped.
+    
+    Args:
+        text: Text that was checked
+        matches: Matches returned by LanguageTool.check for that text
+        
+    Returns:
+        The corrected text
+    """
+    pieces = []
+    position = 0
+    for match in sorted(matches, key=lambda m: m.offset):
+        if not match.replacements or match.offset < position:
+            continue
+        pieces.append(text[position:match.offset])
+        pieces.append(match.replacements[0])
+        position = match.offset + match.errorLength
+    pieces.append(text[position:])
+    return ''.join(pieces)
+
+# Per-process corrector used by the page-checking worker pool
+_worker_corrector = None
+
+def _init_page_worker(options: Dict):
+    """Load the language tools once when a worker process starts."""
+    global _worker_corrector
+    options = dict(options)
+    profiler = Profiler() if options.pop('profile') else None
+    _worker_corrector = PDFCorrector(profiler=profiler, **options)
+
+def _check_page_batch_worker(texts: List[str]) -> Tuple[List[Tuple[str, List[Dict], List[Dict]]], Dict]:
+    """
+    Check a run of consecutive pages with the worker's own corrector.
+    
+    Returns:
+        Tuple of (check_page results, stage timings recorded for them)
+    """
+    results = list(_worker_corrector.check_page_batch(texts))
+    return results, _worker_corrector.profiler.drain()
+
 def main():
     """Main function to run the PDF corrector from command line."""
     parser = argparse.ArgumentParser(description="Self-Correcting PDF Program")
-    parser.add_argument("input_pdf", help="Path to the input PDF file")
+    parser.add_argument("input_pdf", nargs="?",
+                        help="Path to the input PDF file (a directory or manifest file with --batch)")
     parser.add_argument("--output", "-o", help="Path for the corrected PDF file", default=None)
     parser.add_argument("--non-interactive", "-n", action="store_true", help="Run without interactive prompts")
     parser.add_argument("--language", "-l", default="en-US", help="Language code (e.g., en-US, fr-FR)")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Number of processes used to check pages")
+    parser.add_argument("--spacy-batch-size", type=int, default=32, help="Number of pages analyzed per spaCy batch")
+    parser.add_argument("--grammar-servers", type=int, default=1,
+                        help="Number of local LanguageTool servers that check chunks of each page concurrently")
+    parser.add_argument("--grammar-url", action="append", default=None, metavar="URL",
+                        help="Use a running LanguageTool server instead of local ones (repeatable)")
+    parser.add_argument("--grammar-backend", choices=["languagetool", "stub"], default="languagetool",
+                        help="Grammar checker to use; 'stub' is a fast offline stand-in for testing")
+    parser.add_argument("--grammar-chunk-chars", type=int, default=2000,
+                        help="Preferred size of the sentence-aligned chunks sent to LanguageTool servers")
+    parser.add_argument("--precision", action="store_true",
+                        help="Send every sentence to the grammar checker even when --prefilter-words is given")
+    parser.add_argument("--prefilter-words", metavar="WORDS_TXT", default=None,
+                        help="Word list (one per line) of known words; English pages are then screened by "
+                             "a local pre-filter and only suspicious sentences sent to the grammar checker")
+    parser.add_argument("--dedupe-min-pages", type=int, default=0, metavar="N",
+                        help="Check text blocks repeated on at least N pages (running headers, footers, "
+                             "boilerplate) only once (default: 0, disabled)")
+    parser.add_argument("--findings-spill-rows", type=int, default=100000, metavar="N",
+                        help="Number of findings kept in memory before the rest are spilled to a temporary file")
+    parser.add_argument("--cache-dir", default=None, help="Directory for the per-page result cache (disabled if omitted)")
+    parser.add_argument("--cache-size-mb", type=int, default=512, help="Maximum size of the result cache in MB")
+    parser.add_argument("--stream", metavar="FINDINGS_JSONL", default=None,
+                        help="Stream per-page findings to this JSONL file as pages finish (implies --non-interactive)")
+    parser.add_argument("--profile", metavar="REPORT_JSON", default=None,
+                        help="Record per-stage and per-page timings and write them to this JSON file")
+    parser.add_argument("--profile-prometheus", metavar="METRICS_TXT", default=None,
+                        help="Also write the per-stage metrics in Prometheus text format")
+    parser.add_argument("--batch", action="store_true",
+                        help="Correct every PDF in the input directory, or listed in the input manifest file")
+    parser.add_argument("--output-dir", default=None, help="Directory for corrected PDFs in batch mode")
+    parser.add_argument("--report", metavar="REPORT_JSONL", default=None,
+                        help="Write per-file results of a batch run to this JSONL file")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep the corrector loaded and serve JSON job requests from stdin, one per line")
+    parser.add_argument("--socket", metavar="PATH", default=None,
+                        help="With --daemon, serve requests on this Unix socket instead of stdin")
     
     args = parser.parse_args()
+    if args.daemon:
+        if args.input_pdf or args.batch:
+            parser.error("--daemon takes its jobs from requests, not from input_pdf or --batch")
+    elif not args.input_pdf:
+        parser.error("input_pdf is required unless --daemon is given")
+    elif args.batch and not os.path.exists(args.input_pdf):
+        parser.error(f"batch input not found: {args.input_pdf}")
+    if args.socket and not args.daemon:
+        parser.error("--socket requires --daemon")
+    if args.prefilter_words and not args.precision and not supports_language(args.language):
+        parser.error("--prefilter-words screens English text only; it cannot be used with --language "
+                     f"{args.language}")
     
     # Set default output path if not specified
-    if not args.output:
-        base_name = os.path.splitext(os.path.basename(args.input_pdf))[0]
-        args.output = f"{base_name}_corrected.pdf"
+    if not args.output and not (args.batch or args.daemon):
+        args.output = default_output_path(args.input_pdf)
+    
+    profiler = Profiler() if (args.profile or args.profile_prometheus) else None
     
     # Initialize and run the corrector
-    corrector = PDFCorrector(language=args.language)
-    corrector.correct_pdf(args.input_pdf, args.output, not args.non_interactive)
+    corrector = PDFCorrector(language=args.language, workers=args.workers,
+                             spacy_batch_size=args.spacy_batch_size,
+                             cache_dir=args.cache_dir, cache_size_mb=args.cache_size_mb,
+                             grammar_servers=args.grammar_servers, grammar_urls=args.grammar_url,
+                             grammar_chunk_chars=args.grammar_chunk_chars,
+                             grammar_backend=args.grammar_backend, profiler=profiler,
+                             dedupe_min_pages=args.dedupe_min_pages,
+                             findings_spill_rows=args.findings_spill_rows,
+                             grammar_prefilter=not args.precision, prefilter_words=args.prefilter_words)
+    try:
+        if args.daemon and args.socket:
+            serve_socket(corrector, args.socket)
+        elif args.daemon:
+            serve_stdin(corrector)
+        elif args.batch:
+            if args.output_dir:
+                os.makedirs(args.output_dir, exist_ok=True)
+            run_batch(corrector, iter_batch_jobs(args.input_pdf, args.output_dir), args.report)
+        elif args.stream:
+            corrector.correct_pdf_streaming(args.input_pdf, args.output, args.stream)
+        else:
+            corrector.correct_pdf(args.input_pdf, args.output, not args.non_interactive)
+    finally:
+        corrector.close()
+        if args.profile:
+            profiler.write_json(args.profile)
+        if args.profile_prometheus:
+            with open(args.profile_prometheus, "w", encoding="utf-8") as f:
+                f.write(profiler.to_prometheus())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,230 @@
+"""
+Reproducible throughput benchmark for PDFCorrector.
+
+Generates deterministic synthetic PDFs with PyMuPDF, corrects each one and
+reports pages/sec, per-stage latency percentiles and peak memory. Results can
+be saved as a baseline, and later runs fail when they regress against it.
+
+    python benchmark_pdf_corrector.py --backend stub --save-baseline benchmark_baseline.json
+    python benchmark_pdf_corrector.py --backend stub --baseline benchmark_baseline.json
+
+The stub grammar backend needs no LanguageTool server, so the benchmark runs
+fully offline; use --backend languagetool to measure the real checker.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from statistics import median
+from typing import Dict, List
+
+# Synthetic corpora: page count, distinct fonts per page, text spans per page,
+# links and images per page, and the fraction of words replaced by a seeded error
+CASES = {
+    'small': {'pages': 10, 'fonts_per_page': 2, 'spans_per_page': 40,
+              'links_per_page': 1, 'images_per_page': 0, 'error_rate': 0.02},
+    'many_pages': {'pages': 200, 'fonts_per_page': 2, 'spans_per_page': 40,
+                   'links_per_page': 1, 'images_per_page': 0, 'error_rate': 0.02},
+    'dense_spans': {'pages': 20, 'fonts_per_page': 8, 'spans_per_page': 400,
+                    'links_per_page': 2, 'images_per_page': 0, 'error_rate': 0.02},
+    'image_heavy': {'pages': 20, 'fonts_per_page': 2, 'spans_per_page': 40,
+                    'links_per_page': 1, 'images_per_page': 6, 'error_rate': 0.02},
+    'error_heavy': {'pages': 20, 'fonts_per_page': 2, 'spans_per_page': 60,
+                    'links_per_page': 1, 'images_per_page': 0, 'error_rate': 0.2},
+}
+
+# Stages whose per-call latency is reported
+STAGES = ['extract', 'grammar', 'sentence_structure', 'write']
+
+BASE14_FONTS = ['helv', 'heit', 'hebo', 'hebi', 'tiro', 'tiit', 'tibo', 'tibi', 'cour', 'coit', 'cobo', 'cobi']
+WORDS = ('the report describes how each team reviews its results and plans the next quarter '
+         'while the budget was approved by the board after a long discussion about costs').split()
+ERRORS = ['teh', 'recieve', 'seperate', 'occured', 'definately', 'accomodate', 'untill', 'wich']
+
+
+def generate_pdf(path: str, pages: int, fonts_per_page: int, spans_per_page: int,
+                 links_per_page: int, images_per_page: int, error_rate: float, seed: int = 0):
+    """
+    Write a deterministic synthetic PDF.
+
+    Args:
+        path: Output path
+        pages: Number of pages
+        fonts_per_page: Number of distinct fonts used on each page
+        spans_per_page: Number of separately placed text spans on each page
+        links_per_page: Number of URI links on each page
+        images_per_page: Number of embedded images on each page
+        error_rate: Fraction of words replaced by a seeded spelling error
+        seed: Random seed; the same arguments always produce the same content
+    """
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    columns = 4
+    for page_num in range(pages):
+        page = doc.new_page()
+        width, height = page.rect.width, page.rect.height
+        fonts = rng.sample(BASE14_FONTS, min(fonts_per_page, len(BASE14_FONTS)))
+        rows = max(1, (spans_per_page + columns - 1) // columns)
+        row_height = (height - 144) / rows
+        for span in range(spans_per_page):
+            words = [rng.choice(ERRORS) if rng.random() < error_rate else rng.choice(WORDS)
+                     for _ in range(rng.randint(3, 6))]
+            x = 54 + (span % columns) * (width - 108) / columns
+            y = 72 + (span // columns + 1) * row_height
+            page.insert_text((x, y), ' '.join(words) + '.', fontname=fonts[span % len(fonts)],
+                             fontsize=max(4, min(12, row_height * 0.8)))
+        for link in range(links_per_page):
+            rect = fitz.Rect(54 + link * 60, height - 60, 104 + link * 60, height - 48)
+            uri = f"https://example.com/{page_num}/{link}" if rng.random() > 0.1 else f"ftp://example.com/{page_num}"
+            page.insert_link({'kind': fitz.LINK_URI, 'from': rect, 'uri': uri})
+        for image in range(images_per_page):
+            pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+            pixmap.set_rect(pixmap.irect, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+            rect = fitz.Rect(54 + image * 70, height - 40, 114 + image * 70, height - 20)
+            page.insert_image(rect, pixmap=pixmap)
+    doc.set_metadata({})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def percentiles(samples: List[float]) -> Dict:
+    """Return nearest-rank p50/p90/p99 of latency samples, in milliseconds."""
+    if not samples:
+        return {'count': 0, 'p50_ms': 0.0, 'p90_ms': 0.0, 'p99_ms': 0.0}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))] * 1000
+
+    return {'count': len(ordered), 'p50_ms': rank(0.50), 'p90_ms': rank(0.90), 'p99_ms': rank(0.99)}
+
+
+def run_case(name: str, params: Dict, backend: str, repeat: int, workdir: str) -> Dict:
+    """
+    Benchmark one corpus. Runs in its own process so peak RSS is per case.
+
+    Returns:
+        Dictionary with pages/sec, per-stage latency percentiles and peak RSS
+    """
+    from PDFCorrector import PDFCorrector
+    from pipeline_profiler import Profiler, peak_rss_bytes
+
+    pdf_path = os.path.join(workdir, f"{name}.pdf")
+    output_path = os.path.join(workdir, f"{name}_corrected.pdf")
+    generate_pdf(pdf_path, seed=0, **params)
+
+    samples = defaultdict(list)
+    profiler = Profiler(callback=lambda stage, page, wall, cpu: samples[stage].append(wall))
+    run_seconds = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        corrector = PDFCorrector(grammar_backend=backend, profiler=profiler)
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                corrector.correct_pdf(pdf_path, output_path, interactive=False)
+                run_seconds.append(time.perf_counter() - start)
+        finally:
+            corrector.close()
+
+    return {
+        'pages': params['pages'],
+        'pages_per_sec': params['pages'] / median(run_seconds),
+        'stages': {stage: percentiles(samples[stage]) for stage in STAGES},
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float, min_ms: float = 0.5) -> List[str]:
+    """
+    List regressions of results against a baseline.
+
+    Args:
+        results: Results of this run, keyed by '<backend>/<case>'
+        baseline: Earlier results in the same format
+        tolerance: Allowed relative slowdown or growth (0.2 = 20%)
+        min_ms: Latency changes smaller than this are ignored as noise
+
+    Returns:
+        Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['pages_per_sec'] < base['pages_per_sec'] * (1 - tolerance):
+            regressions.append(f"{key}: {result['pages_per_sec']:.1f} pages/sec, "
+                               f"baseline {base['pages_per_sec']:.1f}")
+        for stage, latency in result['stages'].items():
+            base_latency = base['stages'].get(stage)
+            if not base_latency:
+                continue
+            for field in ('p50_ms', 'p90_ms'):
+                if latency[field] > base_latency[field] * (1 + tolerance) + min_ms:
+                    regressions.append(f"{key}: {stage} {field} {latency[field]:.2f}, "
+                                       f"baseline {base_latency[field]:.2f}")
+        if result['peak_rss_bytes'] > base['peak_rss_bytes'] * (1 + tolerance):
+            regressions.append(f"{key}: peak RSS {result['peak_rss_bytes'] // 2**20} MB, "
+                               f"baseline {base['peak_rss_bytes'] // 2**20} MB")
+    return regressions
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="PDFCorrector throughput benchmark")
+    parser.add_argument("--cases", default=",".join(CASES),
+                        help=f"Comma-separated cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--backend", choices=["stub", "languagetool"], default="stub",
+                        help="Grammar backend; 'stub' runs fully offline")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the median is reported")
+    parser.add_argument("--output", "-o", default=None, help="Write results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Fail if results regress against this JSON file")
+    parser.add_argument("--save-baseline", default=None, help="Write results as a new baseline to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default: 0.2)")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            # A fresh process per case keeps peak RSS and warm caches independent
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(run_case, name, CASES[name], args.backend, args.repeat, workdir).result()
+            key = f"{args.backend}/{name}"
+            results[key] = result
+            latencies = ", ".join(f"{stage} p50 {result['stages'][stage]['p50_ms']:.2f} ms" for stage in STAGES)
+            print(f"{key}: {result['pages_per_sec']:.1f} pages/sec, "
+                  f"peak RSS {result['peak_rss_bytes'] // 2**20} MB; {latencies}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark of the sentence pre-filter against the full grammar check.
+
+Generates deterministic pages of text with seeded spelling errors, repeated
+words and agreement errors, checks them once with every sentence sent to the
+grammar checker and once through the pre-filter, and reports how much text
+the pre-filter kept from the checker and how long each run took.
+
+Agreement errors ("The teams reviews the results.") are made only of known
+words, so the pre-filter lets them through; they are the errors it can
+miss. With the LanguageTool backend the benchmark also reports the recall
+of the filtered run against the full check and how many seeded agreement
+errors each run found. The stub backend only flags misspellings and
+repeated words, which the pre-filter always sends on, so its recall says
+nothing and is not reported.
+
+    python benchmark_prefilter.py --backend stub
+    python benchmark_prefilter.py --backend languagetool --pages 50
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import List, Optional, Set, Tuple
+
+from benchmark_pdf_corrector import ERRORS, WORDS
+from grammar_backend import make_grammar_tool
+from sentence_prefilter import PrefilteredGrammarTool, SentencePrefilter
+
+# Sentences with a subject-verb agreement error, made only of correctly spelled words
+AGREEMENT_ERRORS = [
+    'The teams reviews the results.',
+    'The report describe the costs.',
+    'Each team plan the next quarter.',
+    'The results was approved by the board.',
+]
+
+
+def write_word_list(path: str):
+    """Write every correctly spelled word of the generated pages, one per line."""
+    words = set(WORDS)
+    for sentence in AGREEMENT_ERRORS:
+        words.update(sentence.rstrip('.').lower().split())
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sorted(words)) + '\n')
+
+
+def generate_pages(pages: int, sentences_per_page: int, error_rate: float, agreement_rate: float,
+                   seed: int = 0) -> Tuple[List[str], Set[Tuple[int, int, int]]]:
+    """
+    Return deterministic page texts and the seeded agreement errors.
+
+    Args:
+        pages: Number of pages
+        sentences_per_page: Sentences on each page
+        error_rate: Fraction of words replaced by a misspelling or doubled
+        agreement_rate: Fraction of sentences replaced by one with an agreement error
+        seed: Random seed
+
+    Returns:
+        Page texts, and the (page, offset, length) of each agreement error sentence
+    """
+    rng = random.Random(seed)
+    texts = []
+    agreement = set()
+    for page in range(pages):
+        sentences = []
+        offset = 0
+        for _ in range(sentences_per_page):
+            if rng.random() < agreement_rate:
+                sentence = rng.choice(AGREEMENT_ERRORS)
+                agreement.add((page, offset, len(sentence)))
+                sentences.append(sentence)
+                offset += len(sentence) + 1
+                continue
+            words = []
+            for word in rng.sample(WORDS, rng.randint(6, 14)):
+                roll = rng.random()
+                if roll < error_rate / 2:
+                    word = rng.choice(ERRORS)
+                elif roll < error_rate:
+                    words.append(word)
+                words.append(word)
+            sentences.append(' '.join(words).capitalize() + '.')
+            offset += len(sentences[-1]) + 1
+        texts.append(' '.join(sentences))
+    return texts, agreement
+
+
+def found_in(agreement: Set[Tuple[int, int, int]], found: Set[Tuple[int, int, int]]) -> int:
+    """Count the agreement error sentences that at least one match falls inside."""
+    return sum(any(page == match_page and start <= offset < start + length
+                   for match_page, offset, _ in found)
+               for page, start, length in agreement)
+
+
+def run(texts: List[str], backend: str, prefilter: Optional[SentencePrefilter]):
+    """Check every page; return the set of (page, offset, length) matches and the seconds taken."""
+    tool = make_grammar_tool('en-US', backend=backend)
+    if prefilter is not None:
+        tool = PrefilteredGrammarTool(tool, prefilter)
+    try:
+        start = time.perf_counter()
+        found = {(page, match.offset, match.errorLength)
+                 for page, text in enumerate(texts) for match in tool.check(text)}
+        return found, time.perf_counter() - start
+    finally:
+        tool.close()
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Sentence pre-filter benchmark")
+    parser.add_argument("--backend", choices=["stub", "languagetool"], default="stub",
+                        help="Grammar backend; 'stub' runs fully offline")
+    parser.add_argument("--pages", type=int, default=200, help="Number of pages")
+    parser.add_argument("--sentences-per-page", type=int, default=30, help="Sentences on each page")
+    parser.add_argument("--error-rate", type=float, default=0.005, help="Fraction of words with a seeded error")
+    parser.add_argument("--agreement-rate", type=float, default=0.02,
+                        help="Fraction of sentences replaced by one with an agreement error")
+    parser.add_argument("--prefilter-words", default=None,
+                        help="Word list for the pre-filter (default: every correctly spelled word of the pages)")
+    args = parser.parse_args()
+
+    texts, agreement = generate_pages(args.pages, args.sentences_per_page, args.error_rate, args.agreement_rate)
+    word_list = args.prefilter_words
+    if word_list is None:
+        handle, word_list = tempfile.mkstemp(suffix='.txt')
+        os.close(handle)
+        write_word_list(word_list)
+    try:
+        prefilter = SentencePrefilter(word_list)
+    finally:
+        if args.prefilter_words is None:
+            os.remove(word_list)
+    full, full_seconds = run(texts, args.backend, None)
+    filtered, filtered_seconds = run(texts, args.backend, prefilter)
+
+    skipped = 1 - prefilter.chars_sent / prefilter.chars_total if prefilter.chars_total else 0.0
+    print(f"{args.backend}: {args.pages} pages, {prefilter.chars_total} characters, "
+          f"{len(agreement)} seeded agreement errors")
+    print(f"  full check:     {full_seconds:.2f} s, {len(full)} matches")
+    print(f"  pre-filtered:   {filtered_seconds:.2f} s, {len(filtered)} matches, "
+          f"{skipped:.1%} of the text skipped")
+    if args.backend == 'stub':
+        print("  recall: not measured; the stub only flags errors the pre-filter always sends on")
+        return
+    recall = len(full & filtered) / len(full) if full else 1.0
+    print(f"  recall: {recall:.1%} ({len(full - filtered)} matches missed, "
+          f"{len(filtered - full)} not found by the full check)")
+    print(f"  agreement errors found: {found_in(agreement, full)} by the full check, "
+          f"{found_in(agreement, filtered)} pre-filtered")
+
+
+if __name__ == "__main__":
+    main()
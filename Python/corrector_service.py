@@ -0,0 +1,199 @@
+import contextlib
+import json
+import os
+import socketserver
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+
+
+def default_output_path(input_pdf: str, output_dir: Optional[str] = None) -> str:
+    """
+    Return the path a corrected PDF is saved to when none is given.
+
+    Args:
+        input_pdf: Path to the input PDF
+        output_dir: Directory for the output (current directory if omitted)
+
+    Returns:
+        Path of the form <output_dir>/<name>_corrected.pdf
+    """
+    base_name = os.path.splitext(os.path.basename(input_pdf))[0]
+    return os.path.join(output_dir or '', f"{base_name}_corrected.pdf")
+
+
+def iter_batch_jobs(source: str, output_dir: Optional[str] = None) -> Iterator[Dict]:
+    """
+    List the jobs of a batch run.
+
+    Args:
+        source: A directory (every *.pdf in it, sorted by name) or a manifest
+            file with one input path per line, optionally followed by a tab and
+            an output path. Blank lines and lines starting with '#' are ignored.
+        output_dir: Directory for outputs that have no explicit path
+
+    Returns:
+        Iterator of job dictionaries with 'input' and 'output' keys
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith('.pdf'):
+                input_pdf = os.path.join(source, name)
+                yield {'input': input_pdf, 'output': default_output_path(input_pdf, output_dir)}
+        return
+
+    with open(source, 'r', encoding='utf-8') as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            input_pdf, _, output = line.partition('\t')
+            input_pdf = input_pdf.strip()
+            yield {'input': input_pdf, 'output': output.strip() or default_output_path(input_pdf, output_dir)}
+
+
+def run_job(corrector, job: Dict) -> Dict:
+    """
+    Correct one PDF non-interactively with an already loaded corrector.
+
+    Args:
+        corrector: A PDFCorrector instance
+        job: Dictionary with 'input' and optionally 'output' and 'stream'
+            (a JSONL findings path, see PDFCorrector.correct_pdf_streaming)
+
+    Returns:
+        Dictionary with the job's paths, 'stats' and 'seconds', or 'error' if it failed
+    """
+    input_pdf = job['input']
+    output = job.get('output') or default_output_path(input_pdf)
+    result = {'input': input_pdf, 'output': output}
+    start = time.perf_counter()
+    try:
+        if job.get('stream'):
+            result['stats'] = corrector.correct_pdf_streaming(input_pdf, output, job['stream'])
+        else:
+            result['stats'] = corrector.correct_pdf(input_pdf, output, interactive=False)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_batch(corrector, jobs: Iterator[Dict], report_path: Optional[str] = None) -> List[Dict]:
+    """
+    Run every job with the same warm corrector.
+
+    Args:
+        corrector: A PDFCorrector instance
+        jobs: Job dictionaries, see run_job
+        report_path: Optional JSONL file receiving one result per job
+
+    Returns:
+        List of per-file results
+    """
+    results = []
+    report = open(report_path, 'w', encoding='utf-8') if report_path else None
+    try:
+        for job in jobs:
+            result = run_job(corrector, job)
+            results.append(result)
+            if 'error' in result:
+                print(f"Failed {result['input']}: {result['error']}")
+            if report:
+                report.write(json.dumps(result) + "\n")
+                report.flush()
+    finally:
+        if report:
+            report.close()
+
+    failed = len([r for r in results if 'error' in r])
+    print(f"Batch completed: {len(results) - failed} of {len(results)} files corrected.")
+    return results
+
+
+def handle_request(corrector, line: str) -> Optional[Dict]:
+    """
+    Run one daemon request.
+
+    Requests are JSON objects, one per line: either a job (see run_job) or
+    {"command": "shutdown"}.
+
+    Args:
+        corrector: A PDFCorrector instance
+        line: One request line
+
+    Returns:
+        The response dictionary, or None when the daemon should stop
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return {'error': f"Invalid request: {e}"}
+    if not isinstance(request, dict):
+        return {'error': "Invalid request: expected a JSON object"}
+    if request.get('command') == 'shutdown':
+        return None
+    if 'input' not in request:
+        return {'error': "Invalid request: missing 'input'"}
+    # Progress messages go to stderr so stdout carries only responses
+    with contextlib.redirect_stdout(sys.stderr):
+        return run_job(corrector, request)
+
+
+def serve_stdin(corrector, stdin=None, stdout=None):
+    """
+    Serve daemon requests read line by line from stdin, answering on stdout.
+
+    Args:
+        corrector: A PDFCorrector instance
+        stdin: Request stream (sys.stdin if omitted)
+        stdout: Response stream (sys.stdout if omitted)
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        if not line.strip():
+            continue
+        response = handle_request(corrector, line)
+        if response is None:
+            break
+        stdout.write(json.dumps(response) + "\n")
+        stdout.flush()
+
+
+def serve_socket(corrector, socket_path: str):
+    """
+    Serve daemon requests on a Unix socket until a shutdown request arrives.
+
+    Connections are handled one at a time, since they share one corrector.
+    Each connection may send any number of request lines and receives one
+    response line per request.
+
+    Args:
+        corrector: A PDFCorrector instance
+        socket_path: Filesystem path of the socket to create
+    """
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw_line in self.rfile:
+                line = raw_line.decode('utf-8')
+                if not line.strip():
+                    continue
+                response = handle_request(corrector, line)
+                if response is None:
+                    self.server.stopping = True
+                    self.wfile.write(b'{"status": "shutting down"}\n')
+                    break
+                self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+                self.wfile.flush()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with socketserver.UnixStreamServer(socket_path, RequestHandler) as server:
+        server.stopping = False
+        print(f"Listening on {socket_path}", file=sys.stderr)
+        try:
+            while not server.stopping:
+                server.handle_request()
+        finally:
+            os.unlink(socket_path)
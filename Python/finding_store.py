@@ -0,0 +1,256 @@
+import mmap
+import os
+import tempfile
+from array import array
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Finding categories
+ERROR = 0
+STRUCTURE = 1
+FORMATTING = 2
+
+# Layout of one finding row in the spill file
+ROW_DTYPE = np.dtype([
+    ('page', '<i4'), ('category', '<i4'), ('kind', '<i4'), ('message', '<i4'),
+    ('suggestions', '<i4'), ('offset', '<i4'), ('length', '<i4'), ('repeated', '<i4'),
+    ('text_pos', '<i8'), ('text_len', '<i4'), ('flags', '<i4'),
+])
+
+# Error kinds a message can name, as flag bits; one error can be several
+ERROR_KIND_FLAGS = {'grammar': 1, 'spelling': 2}
+
+# Separates the interned suggestions of one finding
+SUGGESTION_SEPARATOR = '\x1f'
+
+
+def error_flags(message: str) -> int:
+    """Return the ERROR_KIND_FLAGS bits of a grammar/spelling error, checked independently by its message."""
+    flags = 0
+    if 'Grammar' in message:
+        flags |= ERROR_KIND_FLAGS['grammar']
+    if 'Spelling' in message:
+        flags |= ERROR_KIND_FLAGS['spelling']
+    return flags
+
+
+def error_kind(message: str) -> str:
+    """Classify a grammar/spelling error by its message: 'grammar', 'spelling' or 'other'."""
+    if 'Grammar' in message:
+        return 'grammar'
+    if 'Spelling' in message:
+        return 'spelling'
+    return 'other'
+
+
+class Finding:
+    """One finding read back from a FindingStore."""
+    __slots__ = ('page', 'category', 'kind', 'message', 'suggestions', 'offset', 'length',
+                 'repeated', 'text')
+
+    def __init__(self, page: int, category: int, kind: str, message: str, suggestions: List[str],
+                 offset: int, length: int, repeated: int, text: str):
+        self.page = page
+        self.category = category
+        self.kind = kind
+        self.message = message
+        self.suggestions = suggestions
+        self.offset = offset
+        self.length = length
+        # Number of pages the finding's block repeats on (0 if not repeated)
+        self.repeated = repeated
+        # Error context, sentence text or formatting details
+        self.text = text
+
+
+class FindingStore:
+    """
+    A compact, column-oriented store of every finding in a document.
+
+    Each finding is one row of typed arrays. Kinds, messages and suggestion
+    lists are interned, so a message repeated thousands of times is kept
+    once, and a sentence reported for several issues is stored once. Past
+    spill_rows rows, rows and texts are moved to temporary files that are
+    memory-mapped when queried, so memory stays bounded for huge reports.
+    Per-kind counts are kept as findings are added. An error counts
+    towards every kind in its flags, so a message naming both grammar and
+    spelling counts as both.
+    """
+    def __init__(self, spill_rows: int = 100000, spill_dir: Optional[str] = None):
+        """
+        Args:
+            spill_rows: Number of rows held in memory before they are spilled to disk
+            spill_dir: Directory for the spill files (the system temporary directory if None)
+        """
+        self.spill_rows = max(1, spill_rows)
+        self.spill_dir = spill_dir
+        self.counts = {}
+        self.category_counts = [0, 0, 0]
+        self._strings = []
+        self._string_ids = {}
+        self._columns = {name: array('q' if name == 'text_pos' else 'i') for name in ROW_DTYPE.names}
+        self._text = bytearray()
+        self._last_text = None
+        self._last_text_ref = (0, 0)
+        # Spill files, created on the first spill
+        self._rows_path = None
+        self._text_path = None
+        self._spilled_rows = 0
+        self._spilled_text = 0
+
+    def __len__(self) -> int:
+        return self._spilled_rows + len(self._columns['page'])
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def _add(self, page: int, category: int, kind: str, text: str, message: str = '',
+             suggestions: List[str] = (), offset: int = 0, length: int = 0, repeated: int = 0,
+             flags: int = 0):
+        if text != self._last_text:
+            encoded = text.encode('utf-8')
+            self._last_text = text
+            self._last_text_ref = (self._spilled_text + len(self._text), len(encoded))
+            self._text.extend(encoded)
+        row = {
+            'page': page, 'category': category, 'kind': self._intern(kind),
+            'message': self._intern(message), 'suggestions': self._intern(SUGGESTION_SEPARATOR.join(suggestions)),
+            'offset': offset, 'length': length, 'repeated': repeated,
+            'text_pos': self._last_text_ref[0], 'text_len': self._last_text_ref[1], 'flags': flags,
+        }
+        for name, value in row.items():
+            self._columns[name].append(value)
+        if flags:
+            for flag_kind, flag in ERROR_KIND_FLAGS.items():
+                if flags & flag:
+                    self.counts[flag_kind] = self.counts.get(flag_kind, 0) + 1
+        else:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.category_counts[category] += 1
+        if len(self._columns['page']) >= self.spill_rows:
+            self._spill()
+
+    def add_error(self, page: int, error: Dict):
+        """Add a grammar/spelling error from check_grammar_spelling found on a page (1-based)."""
+        self._add(page, ERROR, error_kind(error['message']), error['context'], error['message'],
+                  error.get('suggestions', ()), error['offset'], error['length'],
+                  error.get('repeated_block', 0), error_flags(error['message']))
+
+    def add_structure_issue(self, page: int, issue: Dict):
+        """Add a sentence structure issue from check_sentence_structure found on a page (1-based)."""
+        self._add(page, STRUCTURE, issue['type'], issue['text'], issue['suggestion'])
+
+    def add_formatting_issue(self, issue: Dict):
+        """Add a document-wide issue from check_formatting_consistency."""
+        self._add(0, FORMATTING, issue['type'], issue['details'])
+
+    def count(self, kind: Optional[str] = None, category: Optional[int] = None) -> int:
+        """
+        Count findings of one kind (e.g. 'spelling', 'passive_voice') or one category.
+
+        Returns:
+            Number of matching findings (all findings if neither is given)
+        """
+        if kind is not None:
+            return self.counts.get(kind, 0)
+        if category is not None:
+            return self.category_counts[category]
+        return len(self)
+
+    def query(self, page: Optional[int] = None, kind: Optional[str] = None,
+              category: Optional[int] = None) -> Iterator[Finding]:
+        """
+        Iterate over findings, optionally only those of one page, kind or category.
+
+        Args:
+            page: Page number (1-based; 0 for document-wide findings)
+            kind: Finding kind, e.g. 'grammar', 'spelling', 'long_sentence'
+            category: ERROR, STRUCTURE or FORMATTING
+
+        Returns:
+            Iterator of Finding, in the order they were added
+        """
+        with self._spilled_text_map() as spilled_text:
+            for rows in self._row_blocks():
+                mask = np.ones(len(rows), dtype=bool)
+                if page is not None:
+                    mask &= rows['page'] == page
+                if kind in ERROR_KIND_FLAGS:
+                    mask &= (rows['flags'] & ERROR_KIND_FLAGS[kind]) != 0
+                elif kind is not None:
+                    mask &= rows['kind'] == self._string_ids.get(kind, -1)
+                if category is not None:
+                    mask &= rows['category'] == category
+                yield from self._findings(rows[mask], spilled_text)
+
+    def _findings(self, rows: np.ndarray, spilled_text) -> Iterator[Finding]:
+        """Turn selected rows back into Finding records."""
+        for row in rows:
+            suggestions = self._strings[row['suggestions']]
+            yield Finding(
+                int(row['page']), int(row['category']), self._strings[row['kind']],
+                self._strings[row['message']], suggestions.split(SUGGESTION_SEPARATOR) if suggestions else [],
+                int(row['offset']), int(row['length']), int(row['repeated']),
+                self._read_text(spilled_text, int(row['text_pos']), int(row['text_len'])),
+            )
+
+    def _row_blocks(self) -> Iterator[np.ndarray]:
+        """Yield the spilled rows (memory-mapped, not loaded) and then the rows in memory."""
+        if self._spilled_rows:
+            yield np.memmap(self._rows_path, dtype=ROW_DTYPE, mode='r', shape=(self._spilled_rows,))
+        yield self._memory_rows()
+
+    def _memory_rows(self) -> np.ndarray:
+        """Return the rows held in memory as a structured array."""
+        rows = np.zeros(len(self._columns['page']), dtype=ROW_DTYPE)
+        for name, column in self._columns.items():
+            if len(column):
+                rows[name] = np.frombuffer(column, dtype=column.typecode)
+        return rows
+
+    def _spilled_text_map(self):
+        """Memory-map the spilled texts (an empty map if nothing was spilled)."""
+        if not self._spilled_text:
+            return nullcontext(b'')
+        with open(self._text_path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read_text(self, spilled_text, position: int, length: int) -> str:
+        if position >= self._spilled_text:
+            position -= self._spilled_text
+            return self._text[position:position + length].decode('utf-8')
+        return spilled_text[position:position + length].decode('utf-8')
+
+    def _spill(self):
+        """Append the rows and texts held in memory to the spill files."""
+        if self._rows_path is None:
+            fd, self._rows_path = tempfile.mkstemp(prefix='findings-', suffix='.rows', dir=self.spill_dir)
+            os.close(fd)
+            fd, self._text_path = tempfile.mkstemp(prefix='findings-', suffix='.text', dir=self.spill_dir)
+            os.close(fd)
+        rows = self._memory_rows()
+        with open(self._rows_path, 'ab') as f:
+            f.write(rows.tobytes())
+        with open(self._text_path, 'ab') as f:
+            f.write(self._text)
+        self._spilled_rows += len(rows)
+        self._spilled_text += len(self._text)
+        for column in self._columns.values():
+            del column[:]
+        # Text positions are global, so a reference to a spilled text stays valid
+        self._text = bytearray()
+
+    def close(self):
+        """Delete the spill files."""
+        for path in (self._rows_path, self._text_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+        self._rows_path = self._text_path = None
+        self._spilled_rows = self._spilled_text = 0
+
@@ -0,0 +1,200 @@
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+# A sentence ends at ., ! or ? followed by whitespace, or at a blank line
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+
+
+class GrammarMatch:
+    """
+    A LanguageTool match whose offset has been mapped back to page coordinates.
+
+    Exposes the same attributes as language_tool_python's Match that the
+    corrector reads.
+    """
+    def __init__(self, offset: int, errorLength: int, message: str, replacements: List[str], ruleId: str = ''):
+        self.offset = offset
+        self.errorLength = errorLength
+        self.message = message
+        self.replacements = replacements
+        self.ruleId = ruleId
+
+
+def split_sentence_chunks(text: str, max_chars: int) -> List[Tuple[int, str]]:
+    """
+    Split text into sentence-aligned chunks of at most max_chars characters.
+
+    Chunks are contiguous and together cover the whole text. A single sentence
+    longer than max_chars becomes a chunk of its own rather than being cut.
+
+    Args:
+        text: Text to split
+        max_chars: Preferred maximum chunk length
+
+    Returns:
+        List of (offset of the chunk in text, chunk text)
+    """
+    if len(text) <= max_chars:
+        return [(0, text)]
+
+    chunks = []
+    chunk_start = 0
+    last_boundary = 0
+    for boundary in SENTENCE_BOUNDARY.finditer(text):
+        end = boundary.end()
+        if end - chunk_start > max_chars and last_boundary > chunk_start:
+            chunks.append((chunk_start, text[chunk_start:last_boundary]))
+            chunk_start = last_boundary
+        last_boundary = end
+    if len(text) - chunk_start > max_chars and chunk_start < last_boundary < len(text):
+        chunks.append((chunk_start, text[chunk_start:last_boundary]))
+        chunk_start = last_boundary
+    chunks.append((chunk_start, text[chunk_start:]))
+    return chunks
+
+
+class LanguageToolPool:
+    """
+    A pool of LanguageTool servers that checks sentence-aligned chunks concurrently.
+
+    The servers are either local LanguageTool JVMs started by
+    language_tool_python or existing HTTP endpoints. Each long text is split
+    into chunks of about chunk_chars characters, the chunks are checked in
+    parallel on whichever servers are idle, and match offsets are mapped back
+    to the original text. Rules that look across a chunk boundary can differ
+    slightly from a whole-text check.
+    """
+    def __init__(self, language: str, servers: int = 2, urls: Optional[List[str]] = None,
+                 chunk_chars: int = 2000):
+        """
+        Start or connect to the LanguageTool servers.
+
+        Args:
+            language: Language code (e.g., en-US)
+            servers: Number of local LanguageTool servers to start (ignored if urls is given)
+            urls: Base URLs of running LanguageTool servers. A URL may be listed
+                more than once to allow that many concurrent requests to it.
+            chunk_chars: Preferred maximum number of characters per request
+        """
+        import language_tool_python
+
+        self.chunk_chars = chunk_chars
+        if urls:
+            self._tools = [language_tool_python.LanguageTool(language, remote_server=url) for url in urls]
+        else:
+            self._tools = [language_tool_python.LanguageTool(language) for _ in range(max(1, servers))]
+        self._idle = queue.Queue()
+        for tool in self._tools:
+            self._idle.put(tool)
+        self._executor = ThreadPoolExecutor(max_workers=len(self._tools))
+
+    def check(self, text: str) -> List[GrammarMatch]:
+        """
+        Check text for grammar and spelling errors.
+
+        Args:
+            text: Text to check
+
+        Returns:
+            Matches in offset order, with offsets relative to text
+        """
+        chunks = split_sentence_chunks(text, self.chunk_chars)
+        if len(chunks) == 1:
+            return self._check_chunk(chunks[0])
+        return [match for matches in self._executor.map(self._check_chunk, chunks) for match in matches]
+
+    def _check_chunk(self, chunk: Tuple[int, str]) -> List[GrammarMatch]:
+        """Check one chunk on an idle server and shift its matches to text coordinates."""
+        start, chunk_text = chunk
+        tool = self._idle.get()
+        try:
+            matches = tool.check(chunk_text)
+        finally:
+            self._idle.put(tool)
+        return [
+            GrammarMatch(match.offset + start, match.errorLength, match.message,
+                         list(match.replacements), getattr(match, 'ruleId', ''))
+            for match in matches
+        ]
+
+    def close(self):
+        """Stop the worker threads and close every server connection."""
+        self._executor.shutdown()
+        for tool in self._tools:
+            tool.close()
+
+
+class StubGrammarTool:
+    """
+    A fast, offline stand-in for LanguageTool.
+
+    Flags a fixed list of common misspellings and immediately repeated words.
+    It needs no JVM or network access, which makes it suitable for benchmarks
+    and tests that should not depend on LanguageTool.
+    """
+    MISSPELLINGS = {
+        'teh': 'the', 'recieve': 'receive', 'seperate': 'separate', 'occured': 'occurred',
+        'definately': 'definitely', 'accomodate': 'accommodate', 'untill': 'until', 'wich': 'which',
+    }
+    WORD = re.compile(r"[A-Za-z']+")
+
+    def __init__(self, language: str = 'en-US'):
+        self.language = language
+
+    def check(self, text: str) -> List[GrammarMatch]:
+        """
+        Check text for the known misspellings and repeated words.
+
+        Args:
+            text: Text to check
+
+        Returns:
+            Matches in offset order
+        """
+        matches = []
+        previous = None
+        for word in self.WORD.finditer(text):
+            lower = word.group().lower()
+            if lower in self.MISSPELLINGS:
+                matches.append(GrammarMatch(word.start(), len(lower), 'Possible Spelling mistake found.',
+                                            [self.MISSPELLINGS[lower]], 'STUB_SPELLING'))
+            elif previous is not None and lower == previous.group().lower() \
+                    and text[previous.end():word.start()] == ' ':
+                matches.append(GrammarMatch(previous.start(), word.end() - previous.start(),
+                                            'Grammar: possible typo, you repeated a word.',
+                                            [previous.group()], 'STUB_REPEATED_WORD'))
+            previous = word
+        return matches
+
+    def close(self):
+        pass
+
+
+def make_grammar_tool(language: str, servers: int = 1, urls: Optional[List[str]] = None,
+                      chunk_chars: int = 2000, backend: str = 'languagetool'):
+    """
+    Create the grammar checker used by PDFCorrector.
+
+    A single local server is used as a plain language_tool_python LanguageTool;
+    anything else is served by a LanguageToolPool.
+
+    Args:
+        language: Language code (e.g., en-US)
+        servers: Number of local LanguageTool servers
+        urls: Base URLs of running LanguageTool servers
+        chunk_chars: Preferred maximum number of characters per request
+        backend: 'languagetool', or 'stub' for the offline StubGrammarTool
+
+    Returns:
+        An object with check(text) and close() methods
+    """
+    if backend == 'stub':
+        return StubGrammarTool(language)
+    if backend != 'languagetool':
+        raise ValueError(f"Unknown grammar backend: {backend}")
+    if servers <= 1 and not urls:
+        import language_tool_python
+        return language_tool_python.LanguageTool(language)
+    return LanguageToolPool(language, servers=servers, urls=urls, chunk_chars=chunk_chars)
@@ -1,3 +1,61 @@
+import argparse
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# An ATX header: up to three spaces of indentation, then 1-6 '#' and a space or the end of the line
+HEADER = re.compile(r'^ {0,3}(#{1,6})(?=[ \t]|$)')
+# The opening or closing line of a fenced code block
+FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})(.*)$')
+
+MERGED_TITLE = "# Merged Markdown Content"
+MANIFEST_VERSION = 1
+COPY_CHUNK_BYTES = 1 << 20
+
+
+def demote_headers(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Add an extra '#' to every markdown header, leaving fenced code blocks untouched.
+
+    Args:
+        lines: Markdown lines, without line endings
+
+    Returns:
+        Iterator of the lines with headers demoted by one level
+    """
+    for line, _ in _demote(lines):
+        yield line
+
+
+def _demote(lines: Iterable[str]) -> Iterator[Tuple[str, int]]:
+    """Yield (line with its header demoted, new header level or 0 if not a header)."""
+    fence = None
+    for line in lines:
+        fence_match = FENCE.match(line)
+        if fence is not None:
+            # Inside a code block until a fence of the same character, at
+            # least as long and with nothing after it, closes it
+            marker = fence_match.group(1) if fence_match else ''
+            if marker[:1] == fence[:1] and len(marker) >= len(fence) and not fence_match.group(2).strip():
+                fence = None
+            yield line, 0
+        elif fence_match and not (fence_match.group(1)[0] == '`' and '`' in fence_match.group(2)):
+            fence = fence_match.group(1)
+            yield line, 0
+        else:
+            header = HEADER.match(line)
+            if header:
+                yield line[:header.start(1)] + "#" + line[header.start(1):], len(header.group(1)) + 1
+            else:
+                yield line, 0
+
+
 def merge_multiple_markdown_with_extra_hashes(markdown_inputs):
     """
     Merges multiple markdown inputs, adding an extra '#' to each header, and prepending a new top-level header.
@@ -9,18 +67,384 @@ def merge_multiple_markdown_with_extra_hashes(markdown_inputs):
         A string containing the merged markdown content with extra hashes.
     """
 
-    merged_lines = ["# Merged Markdown Content"]
+    merged_lines = [MERGED_TITLE]
 
     for markdown_content in markdown_inputs:
-        lines = markdown_content.splitlines()
-        for line in lines:
-            stripped_line = line.lstrip()
-            if stripped_line.startswith("#"):
-                header_level = len(stripped_line.split(" ")[0])
-                new_header = "#" * (header_level + 1) + line[line.find("#")+header_level:]
-                merged_lines.append(new_header)
-            else:
-                merged_lines.append(line)
+        merged_lines.extend(demote_headers(markdown_content.splitlines()))
         merged_lines.append("") #add an empty line between files.
 
     return "\n".join(merged_lines).rstrip('\n') #remove trailing empty lines.
+
+
+def iter_source_lines(source: Union[str, os.PathLike, Iterable[str]]) -> Iterator[str]:
+    """
+    Read the lines of one markdown input, without line endings.
+
+    Args:
+        source: Path of a UTF-8 markdown file, or an iterable of lines
+
+    Returns:
+        Iterator of lines
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+    else:
+        for line in source:
+            yield line.rstrip("\r\n")
+
+
+def _read_source(source, chunks: queue.Queue, cancelled: threading.Event, chunk_chars: int):
+    """Read one input into a bounded queue of line chunks, ending with None (or the error raised)."""
+    def put(item) -> bool:
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    try:
+        chunk = []
+        size = 0
+        for line in iter_source_lines(source):
+            chunk.append(line)
+            size += len(line)
+            if size >= chunk_chars:
+                if not put(chunk):
+                    return
+                chunk = []
+                size = 0
+        if chunk and not put(chunk):
+            return
+        put(None)
+    except Exception as error:
+        put(error)
+
+
+def read_sources_parallel(sources: Iterable, workers: int = 4, read_ahead: int = 8,
+                          chunk_chars: int = 65536) -> Iterator[Iterator[str]]:
+    """
+    Read markdown inputs in order while the next few are read ahead in background threads.
+
+    At most workers inputs are open at once, and each holds at most
+    read_ahead chunks of about chunk_chars characters, so memory use does not
+    depend on the size or number of inputs.
+
+    Args:
+        sources: File paths or iterables of lines
+        workers: Number of inputs read concurrently
+        read_ahead: Number of chunks buffered per input
+        chunk_chars: Preferred number of characters per chunk
+
+    Returns:
+        Iterator with one iterator of lines per input, in order. Each must be
+        consumed before the next is requested; whatever is left is skipped.
+    """
+    sources = iter(sources)
+    cancelled = threading.Event()
+    window = deque()
+
+    def start_next(executor) -> bool:
+        source = next(sources, None)
+        if source is None:
+            return False
+        chunks = queue.Queue(maxsize=max(1, read_ahead))
+        executor.submit(_read_source, source, chunks, cancelled, chunk_chars)
+        window.append(chunks)
+        return True
+
+    def drain(chunks: queue.Queue) -> Iterator[str]:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield from chunk
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        try:
+            for _ in range(max(1, workers)):
+                if not start_next(executor):
+                    break
+            while window:
+                lines = drain(window.popleft())
+                yield lines
+                # Skip whatever the caller did not read, so the reader thread finishes
+                for _ in lines:
+                    pass
+                start_next(executor)
+        finally:
+            cancelled.set()
+
+
+class MergedWriter:
+    """
+    Writes merged markdown to a binary stream, one line at a time.
+
+    The output is byte for byte what merge_multiple_markdown_with_extra_hashes
+    returns, UTF-8 encoded: trailing newlines are held back until more text
+    follows, so the output never ends in empty lines. position counts the
+    bytes of the merged text including any held-back newlines.
+    """
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.position = 0
+        self._pending_newlines = 0
+
+    def write_bytes(self, data: bytes):
+        """Write encoded merged text."""
+        body = data.rstrip(b"\n")
+        if body:
+            self.stream.write(b"\n" * self._pending_newlines + body)
+            self._pending_newlines = 0
+        self._pending_newlines += len(data) - len(body)
+        self.position += len(data)
+
+    def write_line(self, line: str) -> int:
+        """
+        Write one line of the merged text.
+
+        Returns:
+            Offset of the start of the line in the merged text
+        """
+        separator = b"\n" if self.position else b""
+        offset = self.position + len(separator)
+        self.write_bytes(separator + line.encode("utf-8"))
+        return offset
+
+    def write_input(self, lines: Iterable[str]) -> List[Tuple[int, int, str]]:
+        """
+        Write one markdown input with its headers demoted, followed by the separating empty line.
+
+        Returns:
+            List of (offset, level, title) of each demoted header
+        """
+        sections = []
+        for line, level in _demote(lines):
+            offset = self.write_line(line)
+            if level:
+                sections.append((offset, level, line.lstrip().lstrip("#").strip()))
+        self.write_line("")
+        return sections
+
+
+def merge_markdown_streaming(sources: Iterable, output: Union[str, os.PathLike, BinaryIO],
+                             workers: int = 4, read_ahead: int = 8) -> int:
+    """
+    Merge markdown inputs like merge_multiple_markdown_with_extra_hashes, streaming them to an output.
+
+    Inputs are read in parallel with bounded read-ahead and each demoted line
+    is written as soon as it is read, so memory use is independent of the
+    size of the corpus.
+
+    Args:
+        sources: File paths or iterables of lines, in merge order
+        output: Output file path, or a binary stream to write to
+        workers: Number of inputs read concurrently
+        read_ahead: Number of chunks buffered per input
+
+    Returns:
+        Number of inputs merged
+    """
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "wb") as stream:
+            return merge_markdown_streaming(sources, stream, workers, read_ahead)
+
+    writer = MergedWriter(output)
+    writer.write_line(MERGED_TITLE)
+    count = 0
+    for lines in read_sources_parallel(sources, workers, read_ahead):
+        writer.write_input(lines)
+        count += 1
+    return count
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_manifest(output_path: str, manifest_path: str) -> Optional[Dict]:
+    """Return the manifest of an earlier merge, or None if it is missing or no longer matches the output."""
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("title") != MERGED_TITLE:
+            return None
+        if os.path.getsize(output_path) != manifest["length"]:
+            return None
+        return manifest
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _copy_range(source: BinaryIO, source_length: int, start: int, end: int, writer: MergedWriter):
+    """Copy merged text [start, end) of an earlier output; bytes past its trimmed end are newlines."""
+    source.seek(start)
+    position = start
+    while position < min(end, source_length):
+        data = source.read(min(COPY_CHUNK_BYTES, min(end, source_length) - position))
+        if not data:
+            break
+        writer.write_bytes(data)
+        position += len(data)
+    if end > position:
+        writer.write_bytes(b"\n" * (end - position))
+
+
+def merge_markdown_incremental(sources: List[str], output_path: str, manifest_path: Optional[str] = None,
+                               index_path: Optional[str] = None, workers: int = 4,
+                               read_ahead: int = 8) -> Dict:
+    """
+    Merge markdown files into output_path, re-processing only the inputs that changed.
+
+    A manifest next to the output records each input's size, modification
+    time, SHA-256 and byte range in the merged text. On the next run an input
+    whose size and modification time (or else content hash) are unchanged is
+    copied from the previous output by its byte range; only new or changed
+    inputs are read and demoted again. Inputs may also be added, removed or
+    reordered. The result is identical to a full merge.
+
+    A section index is written as well: every header of the merged output
+    with its byte offset, so a table of contents or a single section (see
+    read_section) can be served with a seek instead of a re-parse.
+
+    Args:
+        sources: Paths of the markdown files, in merge order
+        output_path: Path of the merged markdown file
+        manifest_path: Manifest path (default: output_path + '.manifest.json')
+        index_path: Section index path (default: output_path + '.sections.json')
+        workers: Number of changed inputs read concurrently
+        read_ahead: Number of chunks buffered per input
+
+    Returns:
+        Dictionary with the number of 'inputs', 'reprocessed' and 'reused' inputs
+    """
+    manifest_path = manifest_path or output_path + ".manifest.json"
+    index_path = index_path or output_path + ".sections.json"
+    previous = _load_manifest(output_path, manifest_path)
+    previous_inputs = {entry["path"]: entry for entry in previous["inputs"]} if previous else {}
+
+    # Decide which inputs can be reused before reading any of them
+    plan = []
+    for path in sources:
+        stat = os.stat(path)
+        entry = {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        old = previous_inputs.get(path)
+        if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+            entry["sha256"] = old["sha256"]
+        else:
+            entry["sha256"] = _file_sha256(path)
+            if not old or old["sha256"] != entry["sha256"]:
+                old = None
+        plan.append((entry, old))
+
+    changed = [entry["path"] for entry, old in plan if old is None]
+    changed_lines = read_sources_parallel(changed, workers, read_ahead)
+    temp_path = output_path + ".tmp"
+    sections = []
+    try:
+        with open(temp_path, "wb") as stream, \
+                (open(output_path, "rb") if previous else open(os.devnull, "rb")) as old_output:
+            writer = MergedWriter(stream)
+            writer.write_line(MERGED_TITLE)
+            sections.append({"offset": 0, "level": 1, "title": MERGED_TITLE[2:], "source": None})
+            for entry, old in plan:
+                entry["start"] = writer.position
+                if old is None:
+                    relative = [(offset - entry["start"], level, title)
+                                for offset, level, title in writer.write_input(next(changed_lines))]
+                else:
+                    _copy_range(old_output, previous["length"], old["start"], old["end"], writer)
+                    relative = old["sections"]
+                entry["end"] = writer.position
+                entry["sections"] = relative
+                sections.extend({"offset": entry["start"] + offset, "level": level, "title": title,
+                                 "source": entry["path"]} for offset, level, title in relative)
+            length = stream.tell()
+    finally:
+        changed_lines.close()
+    os.replace(temp_path, output_path)
+
+    manifest = {"version": MANIFEST_VERSION, "title": MERGED_TITLE, "length": length,
+                "inputs": [entry for entry, _ in plan]}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"length": length, "sections": sections}, f, ensure_ascii=False, indent=1)
+    return {"inputs": len(plan), "reprocessed": len(changed), "reused": len(plan) - len(changed)}
+
+
+def read_section(output_path: str, index_path: Optional[str] = None, number: int = 0) -> str:
+    """
+    Read one section of a merged output using its section index.
+
+    A section runs from its header to the next header of the same or a
+    higher level.
+
+    Args:
+        output_path: Path of the merged markdown file
+        index_path: Section index path (default: output_path + '.sections.json')
+        number: Position of the section in the index
+
+    Returns:
+        The section's markdown text
+    """
+    with open(index_path or output_path + ".sections.json", "r", encoding="utf-8") as f:
+        index = json.load(f)
+    sections = index["sections"]
+    section = sections[number]
+    end = index["length"]
+    for following in sections[number + 1:]:
+        if following["level"] <= section["level"]:
+            end = following["offset"]
+            break
+    with open(output_path, "rb") as f:
+        f.seek(section["offset"])
+        return f.read(max(0, min(end, index["length"]) - section["offset"])).decode("utf-8").rstrip("\n")
+
+
+def expand_sources(paths: List[str], exclude: str = "") -> List[str]:
+    """Expand directories into their markdown files (recursively, in sorted order), skipping exclude."""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                sources.extend(os.path.join(root, name) for name in sorted(files) if name.endswith(".md"))
+        else:
+            sources.append(path)
+    excluded = os.path.abspath(exclude) if exclude else None
+    return [source for source in sources if os.path.abspath(source) != excluded]
+
+
+def main():
+    """Merge markdown files from the command line."""
+    parser = argparse.ArgumentParser(description="Merge markdown files, demoting every header by one level")
+    parser.add_argument("output", help="Path of the merged markdown file")
+    parser.add_argument("inputs", nargs="+", help="Markdown files, or directories of them, in merge order")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-process only inputs changed since the last merge (keeps a manifest and "
+                             "a section index next to the output)")
+    parser.add_argument("--workers", "-w", type=int, default=4, help="Number of inputs read concurrently")
+    args = parser.parse_args()
+
+    sources = expand_sources(args.inputs, exclude=args.output)
+    if args.incremental:
+        result = merge_markdown_incremental(sources, args.output, workers=args.workers)
+        print(f"Merged {result['inputs']} files into {args.output} "
+              f"({result['reprocessed']} re-processed, {result['reused']} reused).")
+    else:
+        count = merge_markdown_streaming(sources, args.output, workers=args.workers)
+        print(f"Merged {count} files into {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+
+class PageResultCache:
+    """
+    A persistent, content-addressed cache of per-page check results.
+
+    Entries are keyed by a hash of the page text, the language code and a
+    fingerprint of the checkers that produced them, so an unchanged page is
+    never re-checked and a checker upgrade never serves stale results. The
+    cache is bounded in size; the least recently used entries are evicted first.
+    """
+    DB_NAME = 'page_results.sqlite3'
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Open (or create) the cache in the given directory.
+
+        Args:
+            cache_dir: Directory holding the cache database
+            max_bytes: Upper bound on the total size of stored results
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, self.DB_NAME)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    @staticmethod
+    def make_key(text: str, language: str, fingerprint: str) -> str:
+        """
+        Build the cache key for one page.
+
+        Args:
+            text: Page text
+            language: Language code the page is checked in
+            fingerprint: Identifies the checker versions and settings
+
+        Returns:
+            Hex digest identifying the page's results
+        """
+        digest = hashlib.sha256()
+        for part in (fingerprint, language, text):
+            digest.update(part.encode('utf-8', 'surrogatepass'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple]:
+        """
+        Look up a page's results and mark them as recently used.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Tuple of (corrected_text, errors, structure_issues), or None on a miss
+        """
+        row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return tuple(json.loads(row[0]))
+
+    def put(self, key: str, result: Tuple):
+        """
+        Store a page's results, evicting old entries if the cache is full.
+
+        Args:
+            key: Key from make_key
+            result: Tuple of (corrected_text, errors, structure_issues)
+        """
+        value = json.dumps(result)
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        old = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+        if old is not None:
+            self._total_bytes -= old[0]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, value, size, time.time())
+        )
+        self._total_bytes += size
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        rows = self._conn.execute("SELECT key, size FROM results ORDER BY accessed").fetchall()
+        stale = []
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            stale.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def close(self):
+        """Flush pending access times and close the database."""
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,324 @@
+import os
+import re
+import shutil
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+# Words, runs of whitespace and single punctuation marks
+TOKEN = re.compile(r'\w+|\s+|[^\w\s]')
+
+
+def text_edits(original: str, corrected: str) -> List[Tuple[int, int, str]]:
+    """
+    Describe how corrected differs from original as word-level replacements.
+
+    Args:
+        original: Page text as extracted
+        corrected: Page text after corrections
+
+    Returns:
+        List of (start, end, replacement), where original[start:end] is
+        replaced by replacement, in offset order
+    """
+    original_tokens = [(m.start(), m.group()) for m in TOKEN.finditer(original)]
+    corrected_tokens = [m.group() for m in TOKEN.finditer(corrected)]
+    matcher = SequenceMatcher(None, [token for _, token in original_tokens], corrected_tokens, autojunk=False)
+
+    edits = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        start = original_tokens[i1][0] if i1 < len(original_tokens) else len(original)
+        end = original_tokens[i2][0] if i2 < len(original_tokens) else len(original)
+        edits.append((start, end, ''.join(corrected_tokens[j1:j2])))
+    return edits
+
+
+# PyMuPDF's built-in Base-14 font names, by family and by (bold, italic)
+BASE14_FONTS = {
+    'helv': {(False, False): 'helv', (False, True): 'heit', (True, False): 'hebo', (True, True): 'hebi'},
+    'tiro': {(False, False): 'tiro', (False, True): 'tiit', (True, False): 'tibo', (True, True): 'tibi'},
+    'cour': {(False, False): 'cour', (False, True): 'coit', (True, False): 'cobo', (True, True): 'cobi'},
+}
+# get_text span flags
+FLAG_ITALIC = 2
+FLAG_SERIF = 4
+FLAG_MONOSPACE = 8
+FLAG_BOLD = 16
+
+
+def _page_characters(page) -> List:
+    """
+    List (character, bbox, origin, span, line number) for every character of a page's text.
+
+    The order matches the page text built from get_text("dict") blocks, with
+    None for the newline that ends each line.
+    """
+    characters = []
+    line_number = 0
+    for block in page.get_text("rawdict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                for char in span["chars"]:
+                    characters.append((char["c"], char["bbox"], char["origin"], span, line_number))
+            characters.append(None)
+            line_number += 1
+    return characters
+
+
+def _base14_font(span: Dict) -> str:
+    """Return the Base-14 font closest to a span's font, for text inserted in its place."""
+    name = span["font"].lower()
+    flags = span["flags"]
+    if 'courier' in name or 'mono' in name or flags & FLAG_MONOSPACE:
+        family = 'cour'
+    elif 'times' in name or ('serif' in name and 'sans' not in name) or flags & FLAG_SERIF:
+        family = 'tiro'
+    else:
+        family = 'helv'
+    bold = bool(flags & FLAG_BOLD) or 'bold' in name
+    italic = bool(flags & FLAG_ITALIC) or 'italic' in name or 'oblique' in name
+    return BASE14_FONTS[family][(bold, italic)]
+
+
+def _plan_edits(characters: List, edits: List[Tuple[int, int, str]]) -> Tuple[List, List, List]:
+    """
+    Work out which characters of a page to remove, keep and insert.
+
+    Returns:
+        The edited characters, the kept characters, and (origin, text, font
+        name, font size, colour, width available) for every replacement
+    """
+    def is_word(index: int) -> bool:
+        return characters[index] is not None and not characters[index][0].isspace()
+
+    # Widen each edit to whole words, so each replacement is drawn as one
+    # word with the punctuation or letters around it; edits that then
+    # overlap are rewritten together
+    groups = []
+    for start, end, replacement in edits:
+        if start == end:
+            # Pure insertion: rewrite the preceding character together with it
+            if start == 0 or characters[start - 1] is None:
+                continue
+            start -= 1
+            replacement = characters[start][0] + replacement
+        word_start, word_end = start, end
+        while word_start > 0 and is_word(word_start - 1):
+            word_start -= 1
+        while word_end < len(characters) and is_word(word_end):
+            word_end += 1
+        if groups and word_start < groups[-1][1]:
+            groups[-1][1] = max(groups[-1][1], word_end)
+            groups[-1][2].append((start, end, replacement))
+        else:
+            groups.append([word_start, word_end, [(start, end, replacement)]])
+
+    removed = []
+    insertions = []
+    for start, end, group_edits in groups:
+        pieces = []
+        position = start
+        for edit_start, edit_end, replacement in group_edits:
+            if edit_start < position:
+                continue
+            pieces.extend('\n' if character is None else character[0] for character in characters[position:edit_start])
+            pieces.append(replacement)
+            position = edit_end
+        pieces.extend('\n' if character is None else character[0] for character in characters[position:end])
+        replacement = ''.join(pieces)
+
+        edited = [character for character in characters[start:end] if character is not None]
+        if not edited:
+            continue
+        removed.extend(edited)
+        text = replacement.replace('\n', ' ')
+        if not text.strip():
+            continue
+        first = edited[0]
+        # The replacement may use the room up to the next character left on its line
+        following = characters[end] if end < len(characters) else None
+        if following is not None and following[4] == first[4]:
+            right = following[1][0]
+        else:
+            right = max(character[1][2] for character in edited if character[4] == first[4])
+        span = first[3]
+        colour = span.get("color", 0)
+        rgb = ((colour >> 16 & 255) / 255, (colour >> 8 & 255) / 255, (colour & 255) / 255)
+        insertions.append((first[2], text, _base14_font(span), span["size"], rgb, right - first[1][0]))
+    removed_ids = {id(character) for character in removed}
+    kept = [character for character in characters if character is not None and id(character) not in removed_ids]
+    return removed, kept, insertions
+
+
+# Distance in points within which a glyph counts as drawn where it was
+GLYPH_TOLERANCE = 0.3
+
+
+def _rewrite_page(page, edits: List[Tuple[int, int, str]], text_length: int) -> bool:
+    """
+    Replace the edited text of one page in place and check the result.
+
+    Only the glyphs of the edited characters are redacted; each replacement
+    is written on the baseline where the text it replaces began, in the
+    closest Base-14 font at the original size (smaller if it would not fit
+    before the next character on the line).
+
+    Args:
+        page: PyMuPDF Page object
+        edits: Edits from text_edits, in the page text's coordinates
+        text_length: Length of the page text the edits refer to
+
+    Returns:
+        False if the page layout no longer matches the checked text, or if
+        the rewritten page fails _has_expected_glyphs; the page may then
+        have been changed and must be discarded
+    """
+    import fitz  # PyMuPDF
+
+    characters = _page_characters(page)
+    if len(characters) != text_length:
+        return False
+    removed, kept, insertions = _plan_edits(characters, edits)
+    if not removed:
+        return False
+
+    for character in removed:
+        # Character boxes overlap their neighbours and the lines above and
+        # below, so only the middle of each one is redacted
+        rect = fitz.Rect(character[1])
+        inset_x, inset_y = rect.width / 4, rect.height / 4
+        page.add_redact_annot(fitz.Rect(rect.x0 + inset_x, rect.y0 + inset_y, rect.x1 - inset_x, rect.y1 - inset_y),
+                              cross_out=False, fill=False)
+    options = {'images': fitz.PDF_REDACT_IMAGE_NONE}
+    if hasattr(fitz, 'PDF_REDACT_LINE_ART_NONE'):
+        options['graphics'] = fitz.PDF_REDACT_LINE_ART_NONE
+    page.apply_redactions(**options)
+
+    placed = []
+    for origin, text, fontname, size, colour, width in insertions:
+        needed = fitz.get_text_length(text, fontname=fontname, fontsize=size)
+        if needed > width > 0:
+            size = max(1, size * width / needed)
+            needed = width
+        page.insert_text(origin, text, fontname=fontname, fontsize=size, color=colour)
+        placed.append((origin, text, needed))
+
+    return _has_expected_glyphs(page, kept, placed)
+
+
+def _has_expected_glyphs(page, kept: List, placed: List) -> bool:
+    """
+    Check a rewritten page glyph by glyph.
+
+    Every kept character must still be drawn at its original origin, and the
+    only other glyphs on the page must be the replacements, each spelled in
+    order along the baseline where it was placed.
+
+    Args:
+        page: Rewritten PyMuPDF Page object
+        kept: Characters from _plan_edits that were not edited
+        placed: (origin, text, width) of each inserted replacement
+    """
+    # Origins of the glyphs drawn on the page, by character
+    found = defaultdict(list)
+    for block in page.get_text("rawdict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                for char in span["chars"]:
+                    if not char["c"].isspace():
+                        found[char["c"]].append(tuple(char["origin"]))
+
+    def take(character: str, near) -> bool:
+        origins = found[character]
+        for index, (x, y) in enumerate(origins):
+            if abs(x - near[0]) <= GLYPH_TOLERANCE and abs(y - near[1]) <= GLYPH_TOLERANCE:
+                del origins[index]
+                return True
+        return False
+
+    for character in kept:
+        if not character[0].isspace() and not take(character[0], character[2]):
+            return False
+
+    extra = sorted((x, y, character) for character, origins in found.items() for x, y in origins)
+    for (x, y), text, width in placed:
+        spelled = [glyph for glyph in extra
+                   if abs(glyph[1] - y) <= GLYPH_TOLERANCE and x - GLYPH_TOLERANCE <= glyph[0] <= x + width]
+        if ''.join(glyph[2] for glyph in spelled) != ''.join(text.split()):
+            return False
+        for glyph in spelled:
+            extra.remove(glyph)
+    return not extra
+
+
+def _trial_rewrite(doc, page_num: int, edits: List[Tuple[int, int, str]], text_length: int) -> bool:
+    """Rewrite a copy of one page and report whether the result passes the check."""
+    import fitz  # PyMuPDF
+
+    trial = fitz.open()
+    try:
+        trial.insert_pdf(doc, from_page=page_num, to_page=page_num)
+        return _rewrite_page(trial[0], edits, text_length)
+    finally:
+        trial.close()
+
+
+def write_corrections(pdf_path: str, output_path: str, page_edits: Dict[int, Tuple[int, List]]) -> int:
+    """
+    Write a corrected copy of a PDF, rewriting only the pages that changed.
+
+    With no edits the input is copied byte for byte. Otherwise the copy is
+    opened, only the edited pages are modified, and the changes are appended
+    as an incremental update, so write time and added size scale with the
+    number of edited pages rather than with the document.
+
+    Each page is first rewritten on a scratch copy and checked; a page whose
+    text would not read as the original with the edits applied is left
+    unchanged. If a page that passed on its copy fails in the document, no
+    page is saved and the output stays a byte copy of the input.
+
+    Args:
+        pdf_path: Path to the input PDF
+        output_path: Path for the corrected PDF
+        page_edits: Maps a zero-based page number to (length of the checked
+            page text, edits from text_edits)
+
+    Returns:
+        Number of pages rewritten
+    """
+    import fitz  # PyMuPDF
+
+    same_file = os.path.abspath(pdf_path) == os.path.abspath(output_path)
+    if not same_file:
+        shutil.copyfile(pdf_path, output_path)
+    if not page_edits:
+        return 0
+
+    doc = fitz.open(output_path)
+    try:
+        # Must be asked before any change: editing pages makes it report False
+        incremental = doc.can_save_incrementally()
+        rewritten = 0
+        for page_num in sorted(page_edits):
+            text_length, edits = page_edits[page_num]
+            if not _trial_rewrite(doc, page_num, edits, text_length):
+                continue
+            if not _rewrite_page(doc[page_num], edits, text_length):
+                return 0
+            rewritten += 1
+        if not rewritten:
+            return 0
+        if incremental:
+            doc.save(output_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+        else:
+            # Repaired or otherwise unusual files need a full rewrite
+            temp_path = output_path + '.tmp'
+            doc.save(temp_path, garbage=1)
+            doc.close()
+            os.replace(temp_path, output_path)
+        return rewritten
+    finally:
+        if not doc.is_closed:
+            doc.close()
@@ -0,0 +1,201 @@
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+STAGE_FIELDS = ('calls', 'wall_seconds', 'cpu_seconds', 'bytes_read', 'bytes_written')
+
+
+def peak_rss_bytes() -> int:
+    """Return the peak resident set size of this process so far, or 0 if unknown."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Profiler:
+    """
+    Records wall time, CPU time, call counts, I/O bytes and peak RSS per
+    pipeline stage and per page.
+
+    Stages are timed with the stage() context manager. Pages are attributed
+    by wrapping the page result iterator in iter_pages(), which also records
+    how long each page's results took to arrive.
+    """
+    def __init__(self, callback: Optional[Callable[[str, Optional[int], float, float], None]] = None):
+        """
+        Args:
+            callback: Optional hook called as callback(stage, page, wall_seconds, cpu_seconds)
+                after every timed stage, e.g. to feed an external metrics system
+        """
+        self.callback = callback
+        self.stages = {}
+        self.pages = {}
+        self.current_page = None
+
+    def _stage_stats(self, name: str) -> Dict:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {field: 0 for field in STAGE_FIELDS}
+            stats['peak_rss_bytes'] = 0
+        return stats
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as one call of the named stage."""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            self.record(name, wall, cpu)
+
+    def record(self, name: str, wall: float, cpu: float, calls: int = 1):
+        """Add an already measured stage call."""
+        stats = self._stage_stats(name)
+        stats['calls'] += calls
+        stats['wall_seconds'] += wall
+        stats['cpu_seconds'] += cpu
+        stats['peak_rss_bytes'] = max(stats['peak_rss_bytes'], peak_rss_bytes())
+        if self.current_page is not None:
+            page_stats = self.pages.setdefault(self.current_page, {})
+            page_stats[name] = page_stats.get(name, 0.0) + wall
+        if self.callback:
+            self.callback(name, self.current_page, wall, cpu)
+
+    def add_bytes(self, name: str, read: int = 0, written: int = 0):
+        """Count bytes read or written by the named stage."""
+        stats = self._stage_stats(name)
+        stats['bytes_read'] += read
+        stats['bytes_written'] += written
+
+    def iter_pages(self, page_results: Iterable, first_page: int = 1) -> Iterator:
+        """
+        Attribute work to pages while iterating over per-page results.
+
+        Whatever runs while the next page's result is produced is recorded
+        against that page, along with the total time spent waiting for it as
+        the 'page' stage.
+
+        Args:
+            page_results: Iterator of per-page results, in page order
+            first_page: Page number of the first result
+
+        Returns:
+            Iterator over the same results
+        """
+        results = iter(page_results)
+        page_num = first_page - 1
+        while True:
+            page_num += 1
+            self.current_page = page_num
+            try:
+                with self.stage('page'):
+                    result = next(results)
+            except StopIteration:
+                # The final, empty pull is not a page
+                self.stages['page']['calls'] -= 1
+                self.pages.pop(page_num, None)
+                break
+            finally:
+                self.current_page = None
+            yield result
+
+    def drain(self) -> Dict:
+        """Return the stage totals recorded so far and reset them."""
+        stages, self.stages = self.stages, {}
+        return stages
+
+    def merge(self, stages: Dict):
+        """Add stage totals recorded by another profiler, e.g. in a worker process."""
+        for name, other in stages.items():
+            stats = self._stage_stats(name)
+            for field in STAGE_FIELDS:
+                stats[field] += other[field]
+            stats['peak_rss_bytes'] = max(stats['peak_rss_bytes'], other['peak_rss_bytes'])
+
+    def report(self) -> Dict:
+        """
+        Build the profiling report.
+
+        Returns:
+            Dictionary with per-stage totals, per-page stage times, the slowest
+            pages and the process peak RSS
+        """
+        slowest = sorted(self.pages.items(), key=lambda item: item[1].get('page', 0.0), reverse=True)
+        return {
+            'stages': self.stages,
+            'pages': {str(page): stages for page, stages in sorted(self.pages.items())},
+            'slowest_pages': [page for page, _ in slowest[:10]],
+            'peak_rss_bytes': peak_rss_bytes(),
+        }
+
+    def write_json(self, path: str):
+        """Write the report as JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def to_prometheus(self, prefix: str = 'pdfcorrector') -> str:
+        """
+        Render the stage totals in the Prometheus text exposition format.
+
+        Args:
+            prefix: Metric name prefix
+
+        Returns:
+            Metrics text
+        """
+        metrics = [
+            ('calls', 'stage_calls_total', 'counter', 'Number of times the stage ran'),
+            ('wall_seconds', 'stage_wall_seconds_total', 'counter', 'Wall-clock time spent in the stage'),
+            ('cpu_seconds', 'stage_cpu_seconds_total', 'counter', 'CPU time spent in the stage'),
+            ('bytes_read', 'stage_read_bytes_total', 'counter', 'Bytes read by the stage'),
+            ('bytes_written', 'stage_written_bytes_total', 'counter', 'Bytes written by the stage'),
+            ('peak_rss_bytes', 'stage_peak_rss_bytes', 'gauge', 'Peak resident set size seen at the end of the stage'),
+        ]
+        lines = []
+        for field, name, kind, help_text in metrics:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for stage, stats in sorted(self.stages.items()):
+                lines.append(f'{prefix}_{name}{{stage="{stage}"}} {stats[field]}')
+        lines.append(f"# HELP {prefix}_peak_rss_bytes Peak resident set size of the process")
+        lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+        lines.append(f"{prefix}_peak_rss_bytes {peak_rss_bytes()}")
+        return "\n".join(lines) + "\n"
+
+
+class NullProfiler:
+    """A profiler that records nothing, used when profiling is disabled."""
+    _null_stage = nullcontext()
+
+    def stage(self, name: str):
+        return self._null_stage
+
+    def record(self, name: str, wall: float, cpu: float, calls: int = 1):
+        pass
+
+    def add_bytes(self, name: str, read: int = 0, written: int = 0):
+        pass
+
+    def iter_pages(self, page_results: Iterable, first_page: int = 1) -> Iterable:
+        return page_results
+
+    def drain(self) -> Dict:
+        return {}
+
+    def merge(self, stages: Dict):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,294 @@
+"""
+Field-aware comparison of 'Key: Value' records.
+
+fuzz.ratio over a whole record hides what changed: a timestamp moved by five
+minutes still scores 98%. Here each record is parsed once into fields, and
+fields are compared by value hash first; only fields whose hashes differ
+are scored, by time or numeric distance where the values allow it and by
+fuzz.ratio otherwise.
+
+    python record_compare.py old.txt new.txt
+    python record_compare.py --all-pairs --min-similarity 0.9 records/*.txt
+"""
+import argparse
+import hashlib
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+FIELD = re.compile(r'^\s*([^:\n]+?)\s*:\s*(.*?)\s*$')
+NUMBER = re.compile(r'^[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?$')
+# Identifier field names: 'id' itself or a last word 'id' ('user_id', 'order id'), not 'paid' or 'valid'
+ID_FIELD = re.compile(r'(^|[_\-\s.])id$', re.IGNORECASE)
+
+# Time difference, in seconds, at which a differing timestamp scores 0
+DEFAULT_TIME_SCALE = 86400.0
+
+
+def value_hash(value: str) -> int:
+    """Hash a field value, ignoring runs of whitespace."""
+    return int.from_bytes(hashlib.blake2b(' '.join(value.split()).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def parse_number(value: str) -> Tuple[float, bool]:
+    """
+    Read a field value as a number: a timestamp (seconds since the epoch) or a decimal.
+
+    Returns:
+        Tuple of (the number, or NaN if the value is neither; whether it is a timestamp)
+    """
+    try:
+        return datetime.fromisoformat(value).timestamp(), True
+    except ValueError:
+        pass
+    plain = value.replace(',', '')
+    if NUMBER.match(plain):
+        return float(plain), False
+    return float('nan'), False
+
+
+class ParsedRecord:
+    """
+    A record parsed into fields, with a hash and a numeric reading of each value.
+
+    Lines of the form 'Key: Value' become fields; keys are matched
+    case-insensitively. Lines without a key are appended to the previous
+    field (or to the '' field before the first key).
+    """
+    __slots__ = ('fields', 'hashes', 'numbers', 'times')
+
+    def __init__(self, text: str):
+        fields = {}
+        key = ''
+        for line in text.splitlines():
+            match = FIELD.match(line)
+            if match:
+                key = match.group(1).lower()
+                fields[key] = match.group(2)
+            elif line.strip():
+                fields[key] = (fields.get(key, '') + '\n' + line.strip()).strip()
+        self.fields = fields
+        self.hashes = {key: value_hash(value) for key, value in fields.items()}
+        self.numbers = {}
+        self.times = set()
+        for key, value in fields.items():
+            self.numbers[key], is_time = parse_number(value)
+            if is_time:
+                self.times.add(key)
+
+
+@lru_cache(maxsize=65536)
+def parse_record(text: str) -> ParsedRecord:
+    """Parse a record, reusing the parsed form of a text seen before."""
+    return ParsedRecord(text)
+
+
+class FieldComparer:
+    """
+    Scores how similar records are, field by field.
+
+    Each field scores 1.0 when its value hashes are equal. Otherwise
+    timestamps score by their distance in seconds relative to time_scale,
+    other numbers by their relative difference, identifier fields (by
+    default any field whose name ends in 'id') 0, and text by fuzz.ratio.
+    A field missing from one record scores 0. The record similarity is the
+    weighted mean of the field scores.
+    """
+    def __init__(self, weights: Optional[Dict[str, float]] = None, exact_fields: Optional[Sequence[str]] = None,
+                 time_scale: float = DEFAULT_TIME_SCALE):
+        """
+        Args:
+            weights: Weight of each field by lower-case name (default 1.0)
+            exact_fields: Fields compared by equality only (default: identifier names, see ID_FIELD)
+            time_scale: Time difference, in seconds, at which a timestamp field scores 0
+        """
+        self.weights = {key.lower(): weight for key, weight in (weights or {}).items()}
+        self.exact_fields = {key.lower() for key in exact_fields} if exact_fields is not None else None
+        self.time_scale = time_scale
+
+    def is_exact(self, field: str) -> bool:
+        if self.exact_fields is not None:
+            return field in self.exact_fields
+        return bool(ID_FIELD.search(field))
+
+    def compare(self, first: str, second: str) -> Dict:
+        """
+        Compare two records.
+
+        Args:
+            first: Text of the first record
+            second: Text of the second record
+
+        Returns:
+            Dictionary with 'similarity' (0-1), 'fields' mapping each field
+            to its score, and 'changed' mapping each differing field to
+            (first value, second value, numeric difference or None)
+        """
+        a, b = parse_record(first), parse_record(second)
+        table = RecordTable([first], self, fields=list(dict.fromkeys([*a.fields, *b.fields])))
+        scores, similarity = table.compare_one(b)
+        changed = {}
+        for field, score in zip(table.fields, scores[0]):
+            if score < 1.0:
+                difference = b.numbers.get(field, np.nan) - a.numbers.get(field, np.nan)
+                changed[field] = (a.fields.get(field), b.fields.get(field),
+                                  None if np.isnan(difference) else difference)
+        return {
+            'similarity': float(similarity[0]),
+            'fields': dict(zip(table.fields, scores[0].tolist())),
+            'changed': changed,
+        }
+
+
+class RecordTable:
+    """
+    Parsed records laid out as columns, one per field, for batch comparison.
+
+    Hashes and numeric values are held as (records x fields) arrays, so
+    comparing one record against the whole table is a few vectorized
+    operations; fuzz.ratio only runs on text cells whose hashes differ.
+    """
+    def __init__(self, texts: Sequence[str], comparer: Optional[FieldComparer] = None,
+                 fields: Optional[List[str]] = None):
+        """
+        Args:
+            texts: Record texts
+            comparer: Scoring settings (a default FieldComparer if None)
+            fields: Fields to compare (default: every field of any record, in order of first use)
+        """
+        self.comparer = comparer or FieldComparer()
+        self.records = [parse_record(text) for text in texts]
+        if fields is None:
+            fields = list(dict.fromkeys(field for record in self.records for field in record.fields))
+        self.fields = fields
+        self.hashes, self.numbers, self.present, self.times = self._columns(self.records)
+        self.weights = np.array([self.comparer.weights.get(field, 1.0) for field in fields])
+        self.exact = np.array([self.comparer.is_exact(field) for field in fields], dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _columns(self, records: List[ParsedRecord]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return the hash, number, presence and is-time arrays of records over this table's fields."""
+        shape = (len(records), len(self.fields))
+        hashes = np.zeros(shape, dtype=np.uint64)
+        numbers = np.full(shape, np.nan)
+        present = np.zeros(shape, dtype=bool)
+        times = np.zeros(shape, dtype=bool)
+        for row, record in enumerate(records):
+            for column, field in enumerate(self.fields):
+                if field in record.hashes:
+                    hashes[row, column] = record.hashes[field]
+                    numbers[row, column] = record.numbers[field]
+                    present[row, column] = True
+                    times[row, column] = field in record.times
+        return hashes, numbers, present, times
+
+    def compare_one(self, record: Union[str, ParsedRecord], rows: Optional[slice] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compare one record against records of the table.
+
+        Fields of the record that are not among the table's fields are ignored.
+
+        Args:
+            record: Text or parsed form of the record to compare
+            rows: Slice of table rows to compare against (all rows if None)
+
+        Returns:
+            Tuple of (per-field scores, records x fields, and the weighted
+            similarity of each record)
+        """
+        rows = rows or slice(None)
+        other = parse_record(record) if isinstance(record, str) else record
+        hashes, numbers, present, times = (array[0] for array in self._columns([other]))
+        table_present = self.present[rows]
+        both = table_present & present
+
+        scores = np.zeros(table_present.shape)
+        equal = both & (self.hashes[rows] == hashes)
+        scores[equal] = 1.0
+
+        differ = both & ~equal & ~self.exact
+        table_numbers = self.numbers[rows]
+        numeric = differ & ~np.isnan(table_numbers) & ~np.isnan(numbers)
+        timed = numeric & self.times[rows] & times
+        plain = numeric & ~timed
+        delta = np.abs(table_numbers - numbers)
+        scores[timed] = np.clip(1.0 - delta[timed] / self.comparer.time_scale, 0.0, 1.0)
+        magnitude = np.maximum(np.abs(table_numbers), np.abs(numbers))
+        scores[plain] = np.clip(1.0 - delta[plain] / np.where(magnitude[plain] > 0, magnitude[plain], 1.0), 0.0, 1.0)
+
+        textual = differ & ~numeric
+        if textual.any():
+            from fuzzywuzzy import fuzz
+
+            records = self.records[rows]
+            for row, column in zip(*np.nonzero(textual)):
+                field = self.fields[column]
+                scores[row, column] = fuzz.ratio(records[row].fields[field], other.fields[field]) / 100.0
+
+        # Fields missing from both records do not count
+        weights = np.where(table_present | present, self.weights, 0.0)
+        totals = weights.sum(axis=1)
+        similarity = (scores * weights).sum(axis=1) / np.where(totals > 0, totals, 1.0)
+        return scores, similarity
+
+    def iter_pairs(self, min_similarity: float = 0.0) -> Iterator[Tuple[int, int, float]]:
+        """
+        Compare every pair of records in the table.
+
+        Args:
+            min_similarity: Only yield pairs at least this similar
+
+        Returns:
+            Iterator of (row, later row, similarity)
+        """
+        for row in range(len(self.records) - 1):
+            _, similarity = self.compare_one(self.records[row], slice(row + 1, None))
+            for offset in np.nonzero(similarity >= min_similarity)[0]:
+                yield row, row + 1 + int(offset), float(similarity[offset])
+
+
+def main():
+    """Compare records from the command line."""
+    parser = argparse.ArgumentParser(description="Field-aware comparison of Key: Value records")
+    parser.add_argument("files", nargs="+", help="Record files: the first is compared against the rest")
+    parser.add_argument("--all-pairs", action="store_true", help="Compare every pair of files instead")
+    parser.add_argument("--min-similarity", type=float, default=0.0,
+                        help="Only report pairs at least this similar (0-1)")
+    parser.add_argument("--time-scale", type=float, default=DEFAULT_TIME_SCALE,
+                        help="Time difference in seconds at which a timestamp field scores 0 (default: one day)")
+    args = parser.parse_args()
+
+    texts = []
+    for path in args.files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            texts.append(f.read())
+    comparer = FieldComparer(time_scale=args.time_scale)
+
+    if args.all_pairs:
+        table = RecordTable(texts, comparer)
+        for row, other, similarity in table.iter_pairs(args.min_similarity):
+            print(f"{args.files[row]} ~ {args.files[other]}: {similarity:.1%}")
+        return
+
+    if len(texts) == 2:
+        result = comparer.compare(texts[0], texts[1])
+        print(f"Record similarity: {result['similarity']:.1%}")
+        for field, (old, new, difference) in result['changed'].items():
+            change = f" ({difference:+g})" if difference is not None else ""
+            print(f"  {field}: {old!r} -> {new!r}{change}")
+        return
+
+    table = RecordTable(texts[1:], comparer)
+    _, similarity = table.compare_one(texts[0])
+    for path, score in zip(args.files[1:], similarity):
+        if score >= args.min_similarity:
+            print(f"{path}: {score:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import re
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+from pdf_page_writer import text_edits
+
+# Vertical position is compared in steps of 1/VERTICAL_BANDS of the page height
+VERTICAL_BANDS = 100
+DIGITS = re.compile(r'\d+')
+
+
+def block_key(text: str, bbox: Tuple[float, float, float, float], page_height: float) -> Tuple:
+    """
+    Identify a text block by its normalized text and vertical position.
+
+    Case, whitespace and numbers are normalized away, so 'Page 3 of 40' and
+    'Page 4 of 40' in the same footer position share a key.
+    """
+    normalized = DIGITS.sub('#', ' '.join(text.split()).lower())
+    scale = VERTICAL_BANDS / page_height if page_height else 0
+    return normalized, round(bbox[1] * scale), round(bbox[3] * scale)
+
+
+def page_blocks(blocks: List[Dict], page_height: float) -> List[Tuple[int, int, Tuple]]:
+    """
+    Locate each text block of a page in the page text.
+
+    Args:
+        blocks: The page's get_text("dict") blocks
+        page_height: Height of the page
+
+    Returns:
+        List of (start, end, block_key) covering the page text in order
+    """
+    segments = []
+    offset = 0
+    for block in blocks:
+        if "lines" not in block:
+            continue
+        text = "".join("".join(span["text"] for span in line["spans"]) + "\n" for line in block["lines"])
+        segments.append((offset, offset + len(text), block_key(text, block["bbox"], page_height)))
+        offset += len(text)
+    return segments
+
+
+def find_repeated_blocks(pages: List[List[Tuple[int, int, Tuple]]], min_pages: int) -> Set[Tuple]:
+    """
+    Find the block keys that appear on at least min_pages different pages.
+
+    Args:
+        pages: page_blocks of every page
+        min_pages: Number of pages a block must appear on to count as repeated
+
+    Returns:
+        Set of repeated block keys
+    """
+    page_counts = defaultdict(int)
+    for segments in pages:
+        for key in {key for _, _, key in segments}:
+            page_counts[key] += 1
+    return {key for key, count in page_counts.items() if count >= max(2, min_pages)}
+
+
+def split_page(text: str, segments: List[Tuple[int, int, Tuple]], repeated: Set[Tuple]) -> Tuple[str, List]:
+    """
+    Split a page into its repeated blocks and the remaining text.
+
+    Args:
+        text: Page text
+        segments: page_blocks of the page
+        repeated: Repeated block keys
+
+    Returns:
+        Tuple of (the page text without repeated blocks, list of
+        (start, end, is_repeated) parts covering the page text in order)
+    """
+    parts = []
+    for start, end, key in segments:
+        is_repeated = key in repeated
+        if parts and not is_repeated and not parts[-1][2]:
+            # Consecutive unique blocks form one part
+            parts[-1] = (parts[-1][0], end, False)
+        else:
+            parts.append((start, end, is_repeated))
+    residual = "".join(text[start:end] for start, end, is_repeated in parts if not is_repeated)
+    return residual, parts
+
+
+def merge_block_results(text: str, parts: List[Tuple[int, int, bool]], residual: str,
+                        residual_result: Tuple, block_results: Dict[str, Tuple],
+                        block_pages: Dict[str, int]) -> Tuple[str, List[Dict], List[Dict]]:
+    """
+    Combine the results of a page's remaining text and of its repeated blocks
+    into one check_page result for the whole page.
+
+    Error offsets are moved to page coordinates and their contexts are taken
+    from the page text. Errors from a block whose exact text is on more than
+    one page are marked with 'repeated_block', the number of those pages.
+
+    Args:
+        text: Page text
+        parts: Parts of the page, from split_page
+        residual: The page text without repeated blocks, from split_page
+        residual_result: check_page result for residual
+        block_results: check_page result of each repeated block, by block text
+        block_pages: Number of pages each repeated block text appears on
+
+    Returns:
+        Tuple of (corrected_text, grammar/spelling errors, sentence structure issues)
+    """
+    corrected_residual, residual_errors, residual_issues = residual_result
+    edits = text_edits(residual, corrected_residual) if corrected_residual != residual else []
+    residual_starts = []
+    page_starts = []
+
+    pieces = []
+    errors = []
+    structure_issues = list(residual_issues)
+    edit_index = 0
+    residual_start = 0
+    for start, end, is_repeated in parts:
+        if is_repeated:
+            block = text[start:end]
+            corrected_block, block_errors, block_issues = block_results[block]
+            pieces.append(corrected_block)
+            fields = {'repeated_block': block_pages[block]} if block_pages[block] > 1 else {}
+            errors.extend(_moved_error(text, error, start, **fields) for error in block_errors)
+            structure_issues.extend(block_issues)
+            continue
+
+        residual_end = residual_start + end - start
+        residual_starts.append(residual_start)
+        page_starts.append(start)
+        position = residual_start
+        while edit_index < len(edits):
+            edit_start, edit_end, replacement = edits[edit_index]
+            if edit_start > residual_end or (edit_start == residual_end and edit_end > edit_start):
+                break
+            # An edit that spans into the next part joins text that is not
+            # adjacent on the page, so it is left out
+            if edit_end <= residual_end:
+                pieces.append(residual[position:edit_start])
+                pieces.append(replacement)
+                position = edit_end
+            edit_index += 1
+        pieces.append(residual[position:residual_end])
+        residual_start = residual_end
+
+    for error in residual_errors:
+        part = bisect_right(residual_starts, error['offset']) - 1
+        errors.append(_moved_error(text, error, page_starts[part] - residual_starts[part]))
+
+    errors.sort(key=lambda error: error['offset'])
+    return "".join(pieces), errors, structure_issues
+
+
+def _moved_error(text: str, error: Dict, shift: int, **fields) -> Dict:
+    """Copy an error with its offset shifted into the page text and its context taken from it."""
+    offset = error['offset'] + shift
+    context = text[max(0, offset - 5):offset + error['length'] + 5]
+    return dict(error, offset=offset, context=context, **fields)
@@ -0,0 +1,198 @@
+import hashlib
+import math
+import re
+from bisect import bisect_right
+from typing import Iterable, List, Tuple
+
+from grammar_backend import SENTENCE_BOUNDARY, GrammarMatch
+
+WORD = re.compile(r"[A-Za-z][A-Za-z']*")
+# Word pairs LanguageTool often flags even when every word is spelled correctly
+CONFUSABLES = frozenset([
+    'its', "it's", 'their', 'there', "they're", 'your', "you're", 'then', 'than',
+    'affect', 'effect', 'loose', 'lose', 'whose', "who's",
+])
+VOWEL_SOUND = re.compile(r'^[aeiou]', re.IGNORECASE)
+# Spacing LanguageTool flags: doubled spaces and a space before punctuation
+BAD_SPACING = re.compile(r'\S {2,}\S| [,.;:!?](?:\s|$)')
+# Sentences longer than this many words are always checked
+MAX_SCREENED_WORDS = 50
+# Known words also kept in a plain set for fast lookups, up to this many
+FAST_PATH_WORDS = 50000
+# Separator between suspicious runs in the text sent to the grammar tool
+RUN_SEPARATOR = '\n\n'
+
+
+def supports_language(language: str) -> bool:
+    """Return True if the screen's heuristics apply to a language code such as 'en-US'."""
+    return language.lower().replace('_', '-').split('-')[0] == 'en'
+
+
+class BloomFilter:
+    """
+    A compact set of words with no false negatives and a bounded false positive rate.
+
+    Each word sets num_hashes bits derived from one BLAKE2 digest (double
+    hashing), so membership costs a single hash however many bits are used.
+    """
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.001):
+        """
+        Args:
+            capacity: Number of words the filter is sized for
+            error_rate: False positive rate at that capacity
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, word: str) -> Iterable[int]:
+        digest = hashlib.blake2b(word.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.num_hashes))
+
+    def add(self, word: str):
+        for position in self._positions(word):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, word: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(word))
+
+
+class SentencePrefilter:
+    """
+    Screens sentences so only suspicious ones are sent to the grammar tool.
+
+    A sentence passes the screen when every word is in the word list and no
+    cheap heuristic fires: a repeated word, a lowercase start, a/an before
+    the wrong kind of word, a commonly confused word, bad spacing,
+    unbalanced brackets or quotes, or more than MAX_SCREENED_WORDS words.
+    The known words are fixed when the filter is built, so a text is
+    screened the same way whatever was checked before it. The heuristics
+    are for English only. Grammar errors in sentences made only of known
+    words can be missed; the full check has no such gap.
+    """
+    def __init__(self, word_list: str, capacity: int = 1000000):
+        """
+        Args:
+            word_list: File of known words, one per line
+            capacity: Number of words the known-word filter is sized for
+        """
+        self.known = BloomFilter(capacity)
+        # Common words answered without hashing
+        self._fast_path = set()
+        self.chars_total = 0
+        self.chars_sent = 0
+        with open(word_list, 'rb') as f:
+            data = f.read()
+        # Identifies the screen for result caches: the word list and the filter's sizing
+        self.fingerprint = f"{hashlib.blake2b(data, digest_size=16).hexdigest()}:{capacity}:{MAX_SCREENED_WORDS}"
+        for line in data.decode('utf-8', errors='replace').splitlines():
+            word = line.strip().lower()
+            if word:
+                self.known.add(word)
+
+    def is_known(self, word: str) -> bool:
+        """Return True if a lower-case word is known."""
+        if word in self._fast_path:
+            return True
+        if word in self.known:
+            if len(self._fast_path) < FAST_PATH_WORDS:
+                self._fast_path.add(word)
+            return True
+        return False
+
+    def is_suspicious(self, sentence: str) -> bool:
+        """Return True if the sentence should be checked by the grammar tool."""
+        words = WORD.findall(sentence)
+        if not words or len(words) > MAX_SCREENED_WORDS:
+            return bool(words)
+        if words[0][0].islower():
+            return True
+        if BAD_SPACING.search(sentence):
+            return True
+        if sentence.count('(') != sentence.count(')') or sentence.count('"') % 2:
+            return True
+        previous = None
+        for word in words:
+            lower = word.lower()
+            if lower == previous or lower in CONFUSABLES or not self.is_known(lower):
+                return True
+            if previous in ('a', 'an') and (previous == 'an') != bool(VOWEL_SOUND.match(lower)):
+                return True
+            previous = lower
+        return False
+
+    def suspicious_runs(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Split text into sentences and return the spans that need checking.
+
+        Adjacent suspicious sentences are merged into one run, so the
+        grammar tool still sees them in context.
+
+        Returns:
+            List of (start, end) offsets in text, in order
+        """
+        runs = []
+        start = 0
+        boundaries = [match.end() for match in SENTENCE_BOUNDARY.finditer(text)]
+        for end in boundaries + [len(text)]:
+            if end > start and self.is_suspicious(text[start:end]):
+                if runs and runs[-1][1] == start:
+                    runs[-1] = (runs[-1][0], end)
+                else:
+                    runs.append((start, end))
+            start = end
+        return runs
+
+
+class PrefilteredGrammarTool:
+    """
+    A grammar tool that only sends the suspicious sentences of a text to another one.
+
+    Suspicious runs are joined with blank lines into one request, and the
+    matches are mapped back to offsets in the original text. Matches that
+    would span the added separators are dropped.
+    """
+    def __init__(self, tool, prefilter: SentencePrefilter):
+        self.tool = tool
+        self.prefilter = prefilter
+        self.chunk_chars = getattr(tool, 'chunk_chars', '')
+
+    def check(self, text: str) -> List[GrammarMatch]:
+        """
+        Check the suspicious sentences of text.
+
+        Returns:
+            Matches in offset order, with offsets relative to text
+        """
+        runs = self.prefilter.suspicious_runs(text)
+        self.prefilter.chars_total += len(text)
+        if not runs:
+            return []
+
+        pieces = []
+        run_starts = []
+        position = 0
+        for start, end in runs:
+            run_starts.append(position)
+            pieces.append(text[start:end])
+            position += end - start + len(RUN_SEPARATOR)
+        joined = RUN_SEPARATOR.join(pieces)
+        self.prefilter.chars_sent += len(joined) - len(RUN_SEPARATOR) * (len(runs) - 1)
+
+        mapped = []
+        for match in self.tool.check(joined):
+            index = bisect_right(run_starts, match.offset) - 1
+            run_offset = match.offset - run_starts[index]
+            start, end = runs[index]
+            if run_offset + match.errorLength > end - start:
+                continue
+            mapped.append(GrammarMatch(start + run_offset, match.errorLength, match.message,
+                                       list(match.replacements), getattr(match, 'ruleId', '')))
+        return mapped
+
+    def close(self):
+        self.tool.close()
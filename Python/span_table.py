@@ -0,0 +1,99 @@
+from array import array
+from typing import Dict, List
+
+import numpy as np
+
+
+class SpanTable:
+    """
+    A compact, column-oriented table of every text span in a document.
+
+    Each span is one row: page number, interned font id, font size, font
+    flags, bounding box and character count. Rows are appended into typed
+    arrays while pages are extracted; the columns are exposed as NumPy arrays
+    so formatting checks can run as vectorized operations.
+    """
+    def __init__(self):
+        self.font_names = []
+        self._font_ids = {}
+        self._page = array('i')
+        self._font = array('i')
+        self._size = array('d')
+        self._flags = array('i')
+        self._bbox = array('f')
+        self._chars = array('i')
+
+    def __len__(self) -> int:
+        return len(self._page)
+
+    def font_id(self, font_name: str) -> int:
+        """Return the interned id of a font name, assigning one on first use."""
+        font_id = self._font_ids.get(font_name)
+        if font_id is None:
+            font_id = self._font_ids[font_name] = len(self.font_names)
+            self.font_names.append(font_name)
+        return font_id
+
+    def add_page(self, page_num: int, blocks: List[Dict]):
+        """
+        Append every span of one page.
+
+        Args:
+            page_num: Zero-based page number
+            blocks: The page's get_text("dict") blocks
+        """
+        for block in blocks:
+            for line in block.get("lines", ()):
+                for span in line["spans"]:
+                    self._page.append(page_num)
+                    self._font.append(self.font_id(span["font"]))
+                    self._size.append(span["size"])
+                    self._flags.append(span["flags"])
+                    self._bbox.extend(span["bbox"])
+                    self._chars.append(len(span["text"]))
+
+    @property
+    def page(self) -> np.ndarray:
+        return np.array(self._page, dtype=np.int32)
+
+    @property
+    def font(self) -> np.ndarray:
+        return np.array(self._font, dtype=np.int32)
+
+    @property
+    def size(self) -> np.ndarray:
+        return np.array(self._size, dtype=np.float64)
+
+    @property
+    def flags(self) -> np.ndarray:
+        return np.array(self._flags, dtype=np.int32)
+
+    @property
+    def bbox(self) -> np.ndarray:
+        """Span bounding boxes as an (n, 4) array of x0, y0, x1, y1."""
+        return np.array(self._bbox, dtype=np.float32).reshape(-1, 4)
+
+    @property
+    def chars(self) -> np.ndarray:
+        return np.array(self._chars, dtype=np.int32)
+
+    def font_sizes(self) -> Dict[str, List[float]]:
+        """
+        List the distinct sizes each font is used at.
+
+        Returns:
+            Dictionary mapping font name to its sizes, fonts in order of first use
+        """
+        if not len(self):
+            return {}
+        pairs = np.unique(np.column_stack((self.font, self.size)), axis=0)
+        sizes = {name: [] for name in self.font_names}
+        for font_id, size in pairs:
+            sizes[self.font_names[int(font_id)]].append(float(size))
+        return sizes
+
+    def body_font_size(self) -> float:
+        """Return the font size (to the nearest half point) that holds the most characters."""
+        rounded = np.round(self.size * 2) / 2
+        sizes, inverse = np.unique(rounded, return_inverse=True)
+        return float(sizes[np.argmax(np.bincount(inverse, weights=self.chars))])
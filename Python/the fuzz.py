@@ -1,6 +1,8 @@
 from fuzzywuzzy import fuzz
 from fuzzywuzzy import process
 
+from record_compare import FieldComparer
+
 doc1 = """Order ID: 12345
 Customer: John Doe
 Timestamp: 2025-02-21 10:00:00"""
@@ -12,3 +14,9 @@ Timestamp: 2025-02-21 10:05:00"""
 similarity = fuzz.ratio(doc1, doc2)
 
 print(f"Document Similarity: {similarity}%")
+
+# Field by field, the only difference is a 300-second timestamp change
+result = FieldComparer().compare(doc1, doc2)
+print(f"Record Similarity: {result['similarity']:.1%}")
+for field, (old, new, difference) in result['changed'].items():
+    print(f"  {field}: {old} -> {new} ({difference:+g})" if difference is not None else f"  {field}: {old} -> {new}")
@@ -0,0 +1,112 @@
+"""
+Scaling benchmark for convert_latex_to_mathjax.
+
+Generates deterministic markdown of increasing size and reports the time per
+megabyte of convert_stream. In linear time the time per megabyte stays flat as
+the input grows; the run fails when it grows by more than --max-growth.
+
+    python benchmark_convert_latex_to_mathjax.py
+    python benchmark_convert_latex_to_mathjax.py --sizes 1,4,16 --cases unbalanced
+"""
+import argparse
+import io
+import random
+import sys
+import time
+from typing import List
+
+from convert_latex_to_mathjax import convert_stream
+
+WORDS = ('the group acts on the manifold and each orbit is closed while the form stays '
+         'non-degenerate under every map in the family').split()
+
+
+def paragraph(rng: random.Random, case: str) -> str:
+    """Return one synthetic paragraph for a case."""
+    parts = []
+    for _ in range(rng.randint(20, 60)):
+        roll = rng.random()
+        if roll < 0.08:
+            parts.append(rng.choice(['\\(x_i\\)', '$q_i$', '\\(\\omega\\)', '$$p_i$$']))
+        elif roll < 0.1:
+            parts.append('`$code$`')
+        elif case == 'unbalanced' and roll < 0.2:
+            # Stray delimiters that are never closed
+            parts.append(rng.choice(['$5', '\\(', '\\[', '$$']))
+        else:
+            parts.append(rng.choice(WORDS))
+    return ' '.join(parts) + '\n'
+
+
+def generate(size: int, case: str, seed: int = 0) -> str:
+    """
+    Return deterministic markdown of about size characters.
+
+    Args:
+        size: Number of characters
+        case: 'mixed' for well-formed math, code and display blocks, 'unbalanced'
+            to add unclosed delimiters, 'one_paragraph' for a single paragraph
+            full of unclosed delimiters
+    """
+    rng = random.Random(seed)
+    blocks = []
+    total = 0
+    while total < size:
+        if case == 'one_paragraph':
+            block = ' '.join(rng.choice(['$5', '\\(', '\\[', '$$', 'word', '`']) for _ in range(200)) + '\n'
+        else:
+            roll = rng.random()
+            if roll < 0.1:
+                block = '\\[\nH: M \\to \\mathbb{R}\n\\]\n\n'
+            elif roll < 0.15:
+                block = '```python\nprice = "$5 and $6"\n```\n\n'
+            else:
+                block = paragraph(rng, case) + '\n'
+        blocks.append(block)
+        total += len(block)
+    return ''.join(blocks)
+
+
+def time_conversion(text: str, repeat: int) -> float:
+    """Return the best time, in seconds, of converting text."""
+    best = float('inf')
+    for _ in range(repeat):
+        source = io.StringIO(text, newline='')
+        destination = io.StringIO()
+        started = time.perf_counter()
+        convert_stream(source, destination)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="convert_latex_to_mathjax scaling benchmark")
+    parser.add_argument("--sizes", default="1,2,4,8", help="Comma-separated input sizes in MB (default: 1,2,4,8)")
+    parser.add_argument("--cases", default="mixed,unbalanced,one_paragraph",
+                        help="Comma-separated cases: mixed, unbalanced, one_paragraph")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size; the best is reported")
+    parser.add_argument("--max-growth", type=float, default=2.0,
+                        help="Fail if time per MB at the largest size exceeds this multiple of the smallest")
+    args = parser.parse_args()
+
+    sizes = [float(size) for size in args.sizes.split(",")]
+    failed = False
+    for case in args.cases.split(","):
+        per_mb: List[float] = []
+        for size in sizes:
+            text = generate(int(size * 2**20), case)
+            seconds = time_conversion(text, args.repeat)
+            per_mb.append(seconds / size)
+            print(f"{case}/{size:g} MB: {seconds:.3f} s, {seconds / size * 1000:.1f} ms/MB")
+        growth = per_mb[-1] / per_mb[0]
+        print(f"{case}: time per MB grew {growth:.2f}x from {sizes[0]:g} MB to {sizes[-1]:g} MB")
+        if growth > args.max_growth:
+            failed = True
+    if failed:
+        print("Time per MB grew faster than linear.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Run the markdown converters over the knowledge base as one pipeline.
+
+Each file is read once and passed through the chosen stages in memory:
+'mathjax' (convert_latex_to_mathjax) and 'bullets'
+(convert_to_markdown_bullets), in the order given. Only 'mathjax' runs by
+default: 'bullets' turns every non-empty line into a '- ' item, headers and
+code fences included, so it is only for plain-text notes. The results can be
+written as one file per input and/or merged into one document the way
+merge_multiple_markdown_with_extra_hashes does, with no intermediate files.
+Files are converted across a process pool, and each result is memoized on
+the hash of the input and the stage configuration, so a rebuild only
+converts files that changed:
+
+    python build_docs.py --merged knowledge_base.md
+    python build_docs.py notes/ --stages mathjax,bullets --output-dir build/
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Python"))
+
+from convert_latex_to_mathjax import convert_latex_to_mathjax
+from convert_to_markdown_bullets import convert_to_markdown_bullets
+from merge_multiple_markdown_with_extra_hashes import MERGED_TITLE, MergedWriter, expand_sources
+
+# Each stage, and a version that is part of the memo key; bump it when the stage's output changes
+STAGES: Dict[str, Tuple[Callable[[str], str], int]] = {
+    'mathjax': (convert_latex_to_mathjax, 1),
+    'bullets': (convert_to_markdown_bullets, 2),
+}
+
+DEFAULT_ROOTS = ['筆記', 'Python']
+DEFAULT_STAGES = ['mathjax']
+DEFAULT_CACHE_DIR = '.docs_cache'
+
+
+def stage_config(stages: Sequence[str]) -> bytes:
+    """Describe a stage chain for the memo key."""
+    return json.dumps([[name, STAGES[name][1]] for name in stages]).encode('utf-8')
+
+
+def memo_key(data: bytes, config: bytes) -> str:
+    return hashlib.sha256(config + b'\0' + data).hexdigest()
+
+
+def run_stages(text: str, stages: Sequence[str]) -> str:
+    """Pass text through each stage in order."""
+    for name in stages:
+        text = STAGES[name][0](text)
+    return text
+
+
+class MemoCache:
+    """Stage outputs stored as files named by memo key, under a directory."""
+    def __init__(self, directory: Optional[str]):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.md')
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8', newline='') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, text: str):
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        os.replace(temporary, path)
+
+
+def _convert_batch(texts: Sequence[str], stages: Sequence[str]) -> List[str]:
+    return [run_stages(text, stages) for text in texts]
+
+
+def run_pipeline(sources: Sequence[str], stages: Sequence[str], cache: MemoCache,
+                 workers: Optional[int] = None, window: int = 256, batch_size: int = 16) -> Iterator[Tuple[str, str, bool]]:
+    """
+    Read each source once and pass it through the stages, in source order.
+
+    Memoized results are used as they are; the rest go to a process pool in
+    batches, with at most window files read ahead so memory use stays bounded.
+
+    Args:
+        sources: Markdown files
+        stages: Stage names, in order
+        cache: Memoized stage outputs
+        workers: Number of processes (default: the number of CPUs; 1 converts in this process)
+        window: Files in flight at once
+        batch_size: Files sent to a worker at a time
+
+    Returns:
+        Iterator of (source, converted text, whether it came from the cache)
+    """
+    config = stage_config(stages)
+
+    def read(source: str) -> Tuple[str, str, Optional[str]]:
+        with open(source, 'rb') as f:
+            data = f.read()
+        key = memo_key(data, config)
+        return key, data.decode('utf-8', errors='replace'), cache.get(key)
+
+    if workers == 1 or len(sources) <= batch_size:
+        for source in sources:
+            key, text, cached = read(source)
+            if cached is None:
+                cached = run_stages(text, stages)
+                cache.put(key, cached)
+                yield source, cached, False
+            else:
+                yield source, cached, True
+        return
+
+    # Each entry is [source, key, cached text or None, batch, index in batch];
+    # a batch is [texts, future], its future set once it is submitted
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batch = [[], None]
+
+        def submit():
+            nonlocal batch
+            if batch[0]:
+                batch[1] = executor.submit(_convert_batch, batch[0], stages)
+                batch = [[], None]
+
+        def finish():
+            source, key, cached, owner, index = pending.popleft()
+            if owner is None:
+                return source, cached, True
+            if owner[1] is None:
+                submit()
+            text = owner[1].result()[index]
+            cache.put(key, text)
+            return source, text, False
+
+        for source in sources:
+            key, text, cached = read(source)
+            if cached is not None:
+                pending.append((source, key, cached, None, 0))
+            else:
+                pending.append((source, key, None, batch, len(batch[0])))
+                batch[0].append(text)
+                if len(batch[0]) >= batch_size:
+                    submit()
+            while pending and (len(pending) >= window or pending[0][3] is None
+                               or (pending[0][3][1] is not None and pending[0][3][1].done())):
+                yield finish()
+        submit()
+        while pending:
+            yield finish()
+
+
+def build(sources: Sequence[str], stages: Sequence[str], merged: Optional[str] = None,
+          output_dir: Optional[str] = None, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+          workers: Optional[int] = None, root: str = '.') -> Dict[str, int]:
+    """
+    Convert sources through the stages and write the results.
+
+    Args:
+        sources: Markdown files, in merge order
+        stages: Stage names, in order
+        merged: Write all results merged into this file, headers demoted one level
+        output_dir: Write each result here, at its path relative to root
+        cache_dir: Directory of memoized results (None to convert everything)
+        workers: Number of processes
+        root: Directory that output_dir paths are relative to
+
+    Returns:
+        Dictionary with the number of files 'converted' and 'reused' from the cache
+    """
+    counts = {'converted': 0, 'reused': 0}
+    stream = open(merged, 'wb') if merged else None
+    try:
+        writer = None
+        if stream:
+            writer = MergedWriter(stream)
+            writer.write_line(MERGED_TITLE)
+        for source, text, reused in run_pipeline(sources, stages, MemoCache(cache_dir), workers):
+            counts['reused' if reused else 'converted'] += 1
+            if writer:
+                writer.write_input(text.splitlines())
+            if output_dir:
+                path = os.path.join(output_dir, os.path.relpath(source, root))
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                with open(path, 'w', encoding='utf-8', newline='') as f:
+                    f.write(text)
+    finally:
+        if stream:
+            stream.close()
+    return counts
+
+
+def main():
+    """Build the documents from the command line."""
+    parser = argparse.ArgumentParser(description="Run the markdown converters over the knowledge base in one pass")
+    parser.add_argument("inputs", nargs="*", default=DEFAULT_ROOTS,
+                        help=f"Markdown files or directories (default: {' '.join(DEFAULT_ROOTS)})")
+    parser.add_argument("--stages", default=",".join(DEFAULT_STAGES),
+                        help=f"Comma-separated stages, in order, from {', '.join(STAGES)} "
+                             f"(default: {','.join(DEFAULT_STAGES)})")
+    parser.add_argument("--merged", help="Merge the results into this markdown file")
+    parser.add_argument("--output-dir", help="Write each converted file under this directory")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Directory of memoized results (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Convert every file, without reading or writing the cache")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="Number of processes (default: the number of CPUs)")
+    args = parser.parse_args()
+
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+    if not (args.merged or args.output_dir):
+        parser.error("give --merged, --output-dir or both")
+
+    exclude = args.merged or ""
+    sources = expand_sources(args.inputs, exclude=exclude)
+    if args.output_dir:
+        output_dir = os.path.abspath(args.output_dir)
+        sources = [source for source in sources if not os.path.abspath(source).startswith(output_dir + os.sep)]
+    counts = build(sources, stages, args.merged, args.output_dir, None if args.no_cache else args.cache_dir,
+                   args.workers)
+    print(f"Built {len(sources)} files: {counts['converted']} converted, {counts['reused']} reused from the cache.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,149 @@
+"""
+Convert LaTeX-style math delimiters in markdown to MathJax '$$' delimiters.
+
+Text is scanned once, one paragraph at a time. \\[..\\], \\(..\\) and $..$
+become $$..$$, existing $$..$$ is kept, and fenced code blocks and inline
+code spans are copied unchanged. A math span never crosses a blank line, so
+an unbalanced delimiter only stays literal instead of swallowing the rest of
+the document, and large files are converted as a stream:
+
+    python convert_latex_to_mathjax.py notes.md notes.mathjax.md
+"""
+import argparse
+import io
 import re
+import sys
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, TextIO, Tuple
+
+# Anything that can start a math span or a code span; '\\' and '\$' are
+# matched so that escaped delimiters are skipped
+OPENER = re.compile(r'\\\\|\\\$|\\\[|\\\(|\$\$|\$|`+')
+
+# For each opener, its closer, with escapes matched first so they are skipped
+CLOSER = {
+    '\\[': re.compile(r'\\\]|\\.', re.DOTALL),
+    '\\(': re.compile(r'\\\)|\\.', re.DOTALL),
+    '$$': re.compile(r'\$\$|\\.', re.DOTALL),
+    # A closing '$' is not followed by a digit, so '$5 and $6' is not math
+    '$': re.compile(r'\$(?!\d)|\\.', re.DOTALL),
+}
+CLOSER_TEXT = {'\\[': '\\]', '\\(': '\\)', '$$': '$$', '$': '$'}
+
+FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+BACKTICKS = re.compile(r'`+')
+
+
+def _code_spans(text: str) -> Dict[int, List[int]]:
+    """Map each backtick run length to the sorted positions of runs of exactly that length."""
+    runs = {}
+    for match in BACKTICKS.finditer(text):
+        runs.setdefault(len(match.group()), []).append(match.start())
+    return runs
+
+
+def convert_paragraph(text: str) -> str:
+    """
+    Convert the math delimiters of one paragraph, in a single pass.
+
+    Args:
+        text (str): Paragraph text, with no blank lines or code fences in it
+
+    Returns:
+        str: Converted text
+    """
+    output = []
+    runs = None
+    # Openers whose closer is missing from the rest of the paragraph; a later
+    # opener of the same kind cannot be closed either, which keeps the scan linear
+    unclosed = set()
+    position = 0
+    while True:
+        match = OPENER.search(text, position)
+        if match is None:
+            output.append(text[position:])
+            return ''.join(output)
+        start, end = match.span()
+        token = match.group()
+        output.append(text[position:start])
+        position = end
+
+        if token[0] == '`':
+            # An inline code span closes at the next run of the same length
+            if runs is None:
+                runs = _code_spans(text)
+            same = runs[len(token)]
+            following = bisect_right(same, start)
+            if following < len(same):
+                position = same[following] + len(token)
+            output.append(text[start:position])
+            continue
+
+        if token not in CLOSER or token in unclosed:
+            output.append(token)
+            continue
+
+        for closer in CLOSER[token].finditer(text, end):
+            if closer.group() == CLOSER_TEXT[token]:
+                break
+        else:
+            unclosed.add(token)
+            output.append(token)
+            continue
+
+        content = text[end:closer.start()]
+        position = closer.end()
+        if token == '$$':
+            output.append(text[start:position])
+        else:
+            output.append(f"$${content.strip()}$$")
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+    """
+    Group lines into paragraphs, blank lines and fenced code blocks.
+
+    Args:
+        lines (Iterable[str]): Lines with their line endings
+
+    Returns:
+        Iterator[Tuple[str, bool]]: (text, is_paragraph) for each block, in order
+    """
+    paragraph = []
+    fence_end = None
+    for line in lines:
+        if fence_end is not None:
+            yield line, False
+            if fence_end.match(line):
+                fence_end = None
+            continue
+        opening = FENCE.match(line)
+        if opening or not line.strip():
+            if paragraph:
+                yield ''.join(paragraph), True
+                paragraph = []
+            if opening:
+                # The fence closes at a line of at least as many of the same character
+                marker = opening.group(1)
+                fence_end = re.compile(r'^ {0,3}' + re.escape(marker[0]) + '{%d,}\\s*$' % len(marker))
+            yield line, False
+            continue
+        paragraph.append(line)
+    if paragraph:
+        yield ''.join(paragraph), True
+
+
+def convert_stream(source: Iterable[str], destination: TextIO):
+    """
+    Convert a markdown stream paragraph by paragraph.
+
+    Args:
+        source (Iterable[str]): Input lines, e.g. a file opened with newline=''
+        destination (TextIO): Output stream
+    """
+    for text, is_paragraph in iter_blocks(source):
+        destination.write(convert_paragraph(text) if is_paragraph else text)
+
 
 def convert_latex_to_mathjax(markdown_text):
     """
@@ -11,34 +156,34 @@ def convert_latex_to_mathjax(markdown_text):
     Returns:
         str: Converted text with MathJax delimiters
     """
-    # First, handle display math mode \[ ... \]
-    def replace_display_math(match):
-        content = match.group(1).strip()
-        return f"$${content}$$"
-    
-    # Handle inline math mode \( ... \)
-    def replace_inline_math(match):
-        content = match.group(1).strip()
-        return f"$${content}$$"
-    
-    # Handle single $ delimiters
-    def replace_single_dollar(match):
-        content = match.group(1).strip()
-        return f"$${content}$$"
-        
-    # Convert display math mode
-    text = re.sub(r'\\\[(.*?)\\\]', replace_display_math, markdown_text, flags=re.DOTALL)
-    
-    # Convert inline math mode
-    text = re.sub(r'\\\((.*?)\\\)', replace_inline_math, text, flags=re.DOTALL)
-    
-    # Convert single $ delimiters
-    text = re.sub(r'\$(.*?)\$', replace_single_dollar, text, flags=re.DOTALL)
-    
-    return text
+    output = io.StringIO()
+    convert_stream(io.StringIO(markdown_text, newline=''), output)
+    return output.getvalue()
+
+
+def main():
+    """Convert a markdown file, or standard input, from the command line."""
+    parser = argparse.ArgumentParser(description="Convert LaTeX math delimiters in markdown to MathJax")
+    parser.add_argument("input", nargs="?", default="-", help="Input markdown file ('-' for standard input)")
+    parser.add_argument("output", nargs="?", default="-", help="Output file ('-' for standard output)")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+    destination = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        convert_stream(source, destination)
+    finally:
+        for stream in (source, destination):
+            if stream not in (sys.stdin, sys.stdout):
+                stream.close()
+
 
 # Example usage
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+        sys.exit()
+
     sample_text = """### 1. **Symplectic Manifold**  
 A symplectic manifold \\((M, \\omega)\\) is a smooth, even-dimensional space \\(M\\) equipped with a closed, non-degenerate 2-form \\(\\omega\\). It provides the foundational geometric structure for classical mechanics, where:
 - Points on \\(M\\) represent states in phase space.
@@ -0,0 +1,239 @@
+"""
+Run convert_latex_to_mathjax over the markdown cells of Jupyter notebooks.
+
+Each notebook is parsed once and written back only if one of its markdown
+cells changed. Conversions are cached by a hash of the cell source in a
+SQLite file, so a cell seen before, in this run or an earlier one and in any
+notebook, is not converted again. Notebooks are spread over a process pool:
+
+    python convert_notebooks_to_mathjax.py notebooks/ --workers 8
+    python convert_notebooks_to_mathjax.py a.ipynb b.ipynb --cache mathjax_cache.sqlite
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from convert_latex_to_mathjax import convert_latex_to_mathjax
+
+# Part of every cache key; change it when convert_latex_to_mathjax changes its output
+CONVERTER_VERSION = b'1'
+
+DEFAULT_CACHE = '.mathjax_cache.sqlite'
+
+
+def cell_key(source: str) -> bytes:
+    """Hash a cell source together with the converter version."""
+    return hashlib.blake2b(CONVERTER_VERSION + b'\0' + source.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+class ConversionCache:
+    """
+    Converted cell sources keyed by cell_key, in a SQLite file.
+
+    A cell the converter leaves unchanged is stored as NULL, so only cells
+    that change take up space. Lookups go to an in-memory dictionary first;
+    new entries are kept in memory until flush.
+    """
+    def __init__(self, path: Optional[str], readonly: bool = False):
+        """
+        Args:
+            path: SQLite file (None for an in-memory cache only)
+            readonly: Open an existing file for lookups only, as pool workers do
+        """
+        self.memory: Dict[bytes, Optional[str]] = {}
+        self.new: Dict[bytes, Optional[str]] = {}
+        self.connection = None
+        if path and readonly:
+            if os.path.exists(path):
+                self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        elif path:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS cells (key BLOB PRIMARY KEY, converted TEXT)")
+
+    def convert(self, source: str) -> str:
+        """Return the converted source, converting it only if it is not cached."""
+        key = cell_key(source)
+        if key in self.memory:
+            converted = self.memory[key]
+        else:
+            row = None
+            if self.connection is not None:
+                row = self.connection.execute("SELECT converted FROM cells WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                converted = row[0]
+            else:
+                result = convert_latex_to_mathjax(source)
+                converted = None if result == source else result
+                self.new[key] = converted
+            self.memory[key] = converted
+        return source if converted is None else converted
+
+    def update(self, entries: Iterable[Tuple[bytes, Optional[str]]]):
+        """Add entries computed elsewhere, e.g. by a pool worker."""
+        for key, converted in entries:
+            if key not in self.memory:
+                self.memory[key] = converted
+                self.new[key] = converted
+
+    def flush(self):
+        """Write new entries to the SQLite file."""
+        if self.connection is not None and self.new:
+            with self.connection:
+                self.connection.executemany("INSERT OR REPLACE INTO cells VALUES (?, ?)", self.new.items())
+        self.new = {}
+
+    def close(self):
+        self.flush()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def convert_notebook(path: str, cache: ConversionCache) -> Tuple[bool, int]:
+    """
+    Convert the markdown cells of a notebook in place.
+
+    The notebook is written back, with the layout Jupyter uses, only if a
+    cell changed; the file is replaced atomically.
+
+    Args:
+        path: Notebook file
+        cache: Cache of converted cell sources
+
+    Returns:
+        Tuple of (whether the file was rewritten, number of cells changed)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        notebook = json.load(f)
+
+    changed = 0
+    for cell in notebook.get('cells', []):
+        if cell.get('cell_type') != 'markdown':
+            continue
+        source = cell.get('source', '')
+        text = ''.join(source) if isinstance(source, list) else source
+        converted = cache.convert(text)
+        if converted != text:
+            cell['source'] = converted.splitlines(keepends=True) if isinstance(source, list) else converted
+            changed += 1
+
+    if not changed:
+        return False, 0
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(notebook, f, indent=1, ensure_ascii=False)
+        f.write('\n')
+    os.replace(temporary, path)
+    return True, changed
+
+
+def find_notebooks(paths: Iterable[str]) -> List[str]:
+    """Expand directories into the notebooks they contain, skipping checkpoint copies."""
+    notebooks = []
+    for path in paths:
+        if not os.path.isdir(path):
+            notebooks.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != '.ipynb_checkpoints')
+            notebooks.extend(os.path.join(root, name) for name in sorted(files) if name.endswith('.ipynb'))
+    return notebooks
+
+
+_worker_cache: Optional[ConversionCache] = None
+
+
+def _init_worker(cache_path: Optional[str]):
+    global _worker_cache
+    _worker_cache = ConversionCache(cache_path, readonly=True)
+
+
+def _convert_paths(paths: List[str], cache: ConversionCache) -> List[Tuple[str, bool, int, Optional[str]]]:
+    """Convert notebooks; return (path, rewritten, cells changed, error or None) for each."""
+    results = []
+    for path in paths:
+        try:
+            rewritten, cells = convert_notebook(path, cache)
+            results.append((path, rewritten, cells, None))
+        except (OSError, ValueError) as e:
+            results.append((path, False, 0, str(e)))
+    return results
+
+
+def _convert_batch(paths: List[str]) -> Tuple[List[Tuple[str, bool, int, Optional[str]]], List[Tuple[bytes, Optional[str]]]]:
+    """Convert notebooks in a worker; return the results and the cache entries it added."""
+    results = _convert_paths(paths, _worker_cache)
+    entries = list(_worker_cache.new.items())
+    _worker_cache.new = {}
+    return results, entries
+
+
+def convert_notebooks(paths: List[str], cache_path: Optional[str] = DEFAULT_CACHE, workers: Optional[int] = None,
+                      batch_size: int = 16) -> Dict[str, int]:
+    """
+    Convert the markdown cells of many notebooks across a process pool.
+
+    Workers read the cache file and send back what they converted; only
+    this process writes to the cache.
+
+    Args:
+        paths: Notebook files
+        cache_path: SQLite cache file (None to cache within this run only)
+        workers: Number of processes (default: the number of CPUs; 1 converts in this process)
+        batch_size: Notebooks sent to a worker at a time
+
+    Returns:
+        Dictionary with the number of notebooks 'rewritten', 'unchanged' and 'failed', and of 'cells' changed
+    """
+    totals = {'rewritten': 0, 'unchanged': 0, 'failed': 0, 'cells': 0}
+    cache = ConversionCache(cache_path)
+
+    def record(results):
+        for path, rewritten, cells, error in results:
+            if error is not None:
+                print(f"{path}: {error}")
+                totals['failed'] += 1
+            else:
+                totals['rewritten' if rewritten else 'unchanged'] += 1
+                totals['cells'] += cells
+
+    try:
+        if workers == 1 or len(paths) <= batch_size:
+            record(_convert_paths(paths, cache))
+            return totals
+
+        # Commit what is cached so far so the workers can read it
+        cache.flush()
+        batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_path,)) as executor:
+            for results, entries in executor.map(_convert_batch, batches):
+                record(results)
+                cache.update(entries)
+    finally:
+        cache.close()
+    return totals
+
+
+def main():
+    """Convert notebooks from the command line."""
+    parser = argparse.ArgumentParser(description="Convert LaTeX math in notebook markdown cells to MathJax")
+    parser.add_argument("paths", nargs="+", help="Notebook files or directories to search for .ipynb files")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="Number of processes (default: the number of CPUs)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE,
+                        help=f"SQLite file caching converted cells (default: {DEFAULT_CACHE})")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the cache file")
+    args = parser.parse_args()
+
+    notebooks = find_notebooks(args.paths)
+    totals = convert_notebooks(notebooks, None if args.no_cache else args.cache, args.workers)
+    print(f"Rewrote {totals['rewritten']} notebooks ({totals['cells']} cells), "
+          f"{totals['unchanged']} unchanged, {totals['failed']} failed.")
+
+
+if __name__ == "__main__":
+    main()
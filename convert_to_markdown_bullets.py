@@ -1,3 +1,50 @@
+"""
+Convert text-based bullet points into Markdown bullet points.
+
+Every non-empty line that is not already a '- ' bullet becomes one:
+
+    >>> print(convert_to_markdown_bullets("First point\\nSecond point\\n- Third point"))
+    - First point
+    - Second point
+    - Third point
+
+Files are converted as a stream in fixed-size chunks, so memory use does not
+depend on file size. From the command line a single file or a whole
+directory tree can be converted; trees are converted across a process pool
+and files whose output is already up to date are skipped:
+
+    python convert_to_markdown_bullets.py notes.txt notes.md
+    python convert_to_markdown_bullets.py notes/ markdown/ --workers 8
+"""
+import argparse
+import fnmatch
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, TextIO, Tuple
+
+CHUNK_CHARS = 1 << 20
+
+
+def convert_line(line):
+    """
+    Converts one line, without its '\\n', into a Markdown bullet point.
+    A trailing '\\r' (from a '\\r\\n' ending) is kept, so line endings are not mixed.
+    
+    Parameters:
+    line (str): The input line.
+    
+    Returns:
+    str: '- ' and the stripped line, or the line unchanged if it is empty or already a bullet.
+    """
+    if line.endswith('\r'):
+        return convert_line(line[:-1]) + '\r'
+    stripped_line = line.strip()
+    if stripped_line and not stripped_line.startswith('- '):
+        return f"- {stripped_line}"
+    return line
+
+
 def convert_to_markdown_bullets(text):
     """
     Converts text-based bullet points into Markdown bullet points.
@@ -8,46 +55,177 @@ def convert_to_markdown_bullets(text):
     Returns:
     str: The converted text with Markdown bullet points.
     """
-    lines = text.split('\n')
-    markdown_lines = []
+    return '\n'.join(convert_line(line) for line in text.split('\n'))
+
+
+# Kept under its older name
+convert_text_to_markdown = convert_to_markdown_bullets
+
+
+def iter_lines(stream: TextIO, chunk_chars: int = CHUNK_CHARS) -> Iterator[Tuple[str, bool]]:
+    """
+    Split a text stream on '\\n' while reading it in fixed-size chunks.
     
-    for line in lines:
-        stripped_line = line.strip()
-        if stripped_line and not stripped_line.startswith('- '):
-            markdown_lines.append(f"- {stripped_line}")
-        else:
-            markdown_lines.append(line)
+    Parameters:
+    stream (TextIO): Stream opened with newline='' so line endings are kept as they are.
+    chunk_chars (int): Number of characters read at a time.
     
-    return '\n'.join(markdown_lines)
+    Returns:
+    Iterator[Tuple[str, bool]]: Each line without its '\\n', and whether a '\\n' followed it.
+    """
+    partial = ''
+    while True:
+        chunk = stream.read(chunk_chars)
+        if not chunk:
+            break
+        lines = (partial + chunk).split('\n')
+        partial = lines.pop()
+        for line in lines:
+            yield line, True
+    yield partial, False
 
 
-def convert_text_to_markdown(input_text):
+def convert_stream(source: TextIO, destination: TextIO, chunk_chars: int = CHUNK_CHARS):
     """
-    Converts text-based bullet points into Markdown bullet points.
+    Converts a text stream into Markdown bullet points, chunk by chunk.
+    
+    The output is exactly what convert_to_markdown_bullets returns for the
+    whole text, but only one chunk is held in memory at a time.
+    
+    Parameters:
+    source (TextIO): The input stream, opened with newline=''.
+    destination (TextIO): The output stream, opened with newline=''.
+    chunk_chars (int): Number of characters read at a time.
+    """
+    buffer = []
+    size = 0
+    for line, has_newline in iter_lines(source, chunk_chars):
+        converted = convert_line(line)
+        buffer.append(converted + '\n' if has_newline else converted)
+        size += len(converted)
+        if size >= chunk_chars:
+            destination.writelines(buffer)
+            buffer = []
+            size = 0
+    destination.writelines(buffer)
+
+
+def open_text(file_path, mode):
+    """Open a file as UTF-8 text with line endings left untouched; undecodable bytes are passed through."""
+    return open(file_path, mode, encoding='utf-8', errors='surrogateescape', newline='')
+
+
+def convert_file(input_file_path, output_file_path):
+    """
+    Converts a file with text-based bullet points into a Markdown file, as a stream.
+    
+    Parameters:
+    input_file_path (str): The path to the input file.
+    output_file_path (str): The path to the output Markdown file.
+    """
+    with open_text(input_file_path, 'r') as source, open_text(output_file_path, 'w') as destination:
+        convert_stream(source, destination)
+
+
+def is_up_to_date(input_file_path, output_file_path):
+    """Return True if the output exists and is newer than the input."""
+    try:
+        return os.stat(output_file_path).st_mtime_ns >= os.stat(input_file_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def plan_tree(input_dir, output_dir, pattern='*.txt', force=False) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    List the files of a directory tree that need converting.
     
     Parameters:
-    input_text (str): The input text containing bullet points.
+    input_dir (str): Directory to convert.
+    output_dir (str): Directory for the Markdown files; the tree structure is kept.
+    pattern (str): Only files whose names match this glob are converted.
+    force (bool): Convert files even if their output is up to date.
     
     Returns:
-    str: The converted text with Markdown bullet points.
+    Tuple[List[Tuple[str, str]], int]: (input path, output path) pairs to convert, and the number skipped.
     """
-    lines = input_text.split('\n')
-    markdown_lines = []
+    jobs = []
+    skipped = 0
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            input_file_path = os.path.join(root, name)
+            relative = os.path.relpath(input_file_path, input_dir)
+            output_file_path = os.path.join(output_dir, os.path.splitext(relative)[0] + '.md')
+            if not force and is_up_to_date(input_file_path, output_file_path):
+                skipped += 1
+                continue
+            jobs.append((input_file_path, output_file_path))
+    return jobs, skipped
+
 
-    for line in lines:
-        stripped_line = line.strip()
-        if stripped_line and not stripped_line.startswith('- '):
-            markdown_lines.append(f"- {stripped_line}")
-        else:
-            markdown_lines.append(line)
+def _convert_job(job: Tuple[str, str]) -> str:
+    input_file_path, output_file_path = job
+    os.makedirs(os.path.dirname(output_file_path) or '.', exist_ok=True)
+    convert_file(input_file_path, output_file_path)
+    return output_file_path
+
+
+def convert_tree(input_dir, output_dir, pattern='*.txt', workers=None, force=False) -> Tuple[int, int]:
+    """
+    Converts every matching file of a directory tree across a process pool.
     
-    return '\n'.join(markdown_lines)
+    Parameters:
+    input_dir (str): Directory to convert.
+    output_dir (str): Directory for the Markdown files; the tree structure is kept.
+    pattern (str): Only files whose names match this glob are converted.
+    workers (int): Number of processes (default: the number of CPUs).
+    force (bool): Convert files even if their output is up to date.
+    
+    Returns:
+    Tuple[int, int]: The number of files converted and skipped.
+    """
+    jobs, skipped = plan_tree(input_dir, output_dir, pattern, force)
+    if workers == 1 or len(jobs) < 2:
+        for job in jobs:
+            _convert_job(job)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(_convert_job, jobs, chunksize=16):
+                pass
+    return len(jobs), skipped
+
+
+def main():
+    """Convert a file, a directory tree or standard input from the command line."""
+    parser = argparse.ArgumentParser(description="Convert text-based bullet points into Markdown bullet points")
+    parser.add_argument("input", help="Input file or directory ('-' for standard input)")
+    parser.add_argument("output", nargs="?", default="-",
+                        help="Output file or directory ('-' or omitted for standard output)")
+    parser.add_argument("--pattern", default="*.txt", help="Files to convert in a directory (default: *.txt)")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="Number of processes for a directory (default: the number of CPUs)")
+    parser.add_argument("--force", action="store_true", help="Convert files even if their output is up to date")
+    args = parser.parse_args()
 
+    if os.path.isdir(args.input):
+        if args.output == "-":
+            parser.error("converting a directory needs an output directory")
+        converted, skipped = convert_tree(args.input, args.output, args.pattern, args.workers, args.force)
+        print(f"Converted {converted} files, skipped {skipped} up-to-date files.")
+    elif args.input == "-" or args.output == "-":
+        source = sys.stdin if args.input == "-" else open_text(args.input, 'r')
+        destination = sys.stdout if args.output == "-" else open_text(args.output, 'w')
+        try:
+            convert_stream(source, destination)
+        finally:
+            for stream in (source, destination):
+                if stream not in (sys.stdin, sys.stdout):
+                    stream.close()
+    else:
+        convert_file(args.input, args.output)
 
-# Example usage
-input_text = """First point
-Second point
-Third point"""
 
-converted_text = convert_to_markdown_bullets(input_text)
-print(converted_text)
+if __name__ == "__main__":
+    main()